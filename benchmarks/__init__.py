@@ -0,0 +1,9 @@
+# benchmarks/__init__.py
+"""
+Offline performance benchmarks. Stand-ins replace the webcam
+(sources.SyntheticCapture / VideoFileCapture), the ROS graph
+(fake_ros.FakeRosNodeHandler) and the ESP32 (fake_esp.FakeEsp), so the
+scenarios in scenarios.py run on any machine. Entry point:
+
+    python -m benchmarks.run --out report.json
+"""
@@ -0,0 +1,91 @@
+# benchmarks/fake_esp.py
+"""
+ESP32 stand-in behind a pseudo-terminal: SerialHandler opens `port` as if it
+were /dev/ttyUSB0. The fake streams telemetry lines (the key:value format of
+bridge/serial_protocol.py) at `line_rate` and records every command byte it
+receives with its arrival time. POSIX only.
+"""
+
+import math
+import os
+import select
+import threading
+import time
+import tty
+
+
+class FakeEsp:
+    def __init__(self, line_rate=50, imu_every=1):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.line_rate = line_rate
+        self._imu_every = imu_every
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self.received = []   # (monotonic time, byte)
+        self.lines_sent = 0
+        self._threads = [threading.Thread(target=self._read, daemon=True)]
+        if line_rate and line_rate > 0:
+            self._threads.append(threading.Thread(target=self._write, daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def _line(self, n, t):
+        line = f"UL:{100 + 50 * math.sin(t):.1f},UR:{100 + 50 * math.cos(t):.1f}"
+        if self._imu_every and n % self._imu_every == 0:
+            line += (f" qx=0 qy=0 qz={math.sin(t / 20):.4f} qw={math.cos(t / 20):.4f}"
+                     f" gx=0 gy=0 gz=0.1 ax=0 ay=0 az=9.81")
+        return (line + "\n").encode()
+
+    def _write(self):
+        period = 1.0 / self.line_rate
+        start = next_due = time.monotonic()
+        n = 0
+        while not self._stop.is_set():
+            # Only write while somebody drains the pty, or the write would block
+            _, writable, _ = select.select([], [self._master], [], 0.1)
+            if writable:
+                try:
+                    os.write(self._master, self._line(n, time.monotonic() - start))
+                except OSError:
+                    return
+                n += 1
+                self.lines_sent = n
+            next_due += period
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_due = time.monotonic()
+
+    def _read(self):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.1)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+            now = time.monotonic()
+            with self._cond:
+                self.received.extend((now, b) for b in data)
+                self._cond.notify_all()
+
+    def wait_for_bytes(self, count, timeout=1.0):
+        """Block until more than `count` bytes arrived; returns the newest (time, byte) or None."""
+        with self._cond:
+            if self._cond.wait_for(lambda: len(self.received) > count, timeout):
+                return self.received[-1]
+        return None
+
+    def close(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,97 @@
+# benchmarks/fake_ros.py
+"""
+RosNodeHandler stand-in: no rclpy, same interface. Generator threads write
+ultrasonic and IMU samples into a TelemetryState at fixed rates and notify
+listeners like the real executor callbacks; published commands are recorded
+with their arrival time.
+"""
+
+import math
+import threading
+import time
+
+from bridge.telemetry_state import TelemetryState
+from utils.config import TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES
+
+DEFAULT_RATES = {"ultrasonic_left": 20, "ultrasonic_right": 20, "imu": 200}
+
+
+class FakeRosNodeHandler:
+    def __init__(self, rates=None):
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.telemetry = TelemetryState(TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES)
+        self._listeners = []
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self.commands = []   # (monotonic time, payload)
+        self.modes = []
+        self._threads = [
+            threading.Thread(target=self._generate, args=(topic, rate), daemon=True)
+            for topic, rate in self.rates.items() if rate and rate > 0
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _sample(self, topic, t):
+        if topic == "imu":
+            yaw = 0.1 * t
+            return (0.0, 0.0, math.sin(yaw / 2), math.cos(yaw / 2),
+                    0.0, 0.0, 0.1, 0.05 * math.sin(t), 0.0, 9.81)
+        phase = 0.0 if topic == "ultrasonic_left" else 1.0
+        return 100.0 + 50.0 * math.sin(0.5 * t + phase)
+
+    def _generate(self, topic, rate):
+        period = 1.0 / rate
+        start = next_due = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            self.telemetry.update(topic, self._sample(topic, now - start))
+            for fn in self._listeners:
+                try:
+                    fn()
+                except Exception as e:
+                    print("[FakeRosNodeHandler] listener error:", e)
+            next_due += period
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                next_due = time.monotonic()
+
+    # --- RosNodeHandler interface -----------------------------------------
+
+    def alive(self):
+        return not self._stop.is_set()
+
+    def publish_command(self, mapped_char):
+        with self._cond:
+            self.commands.append((time.monotonic(), mapped_char))
+            self._cond.notify_all()
+
+    def publish_mode(self, mode_str):
+        with self._cond:
+            self.modes.append((time.monotonic(), mode_str))
+            self._cond.notify_all()
+
+    def get_latest_data(self):
+        return self.telemetry.to_dict()
+
+    def get_history(self, topic, seconds=None, start=None):
+        return self.telemetry.history(topic, seconds, start)
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def shutdown(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+    # --- benchmark helpers ------------------------------------------------
+
+    def wait_for_command(self, count, timeout=1.0):
+        """Block until more than `count` commands arrived; returns the newest (time, payload) or None."""
+        with self._cond:
+            if self._cond.wait_for(lambda: len(self.commands) > count, timeout):
+                return self.commands[-1]
+        return None
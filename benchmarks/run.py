@@ -0,0 +1,136 @@
+# benchmarks/run.py
+"""
+Run benchmark scenarios and write a JSON report, or compare two reports.
+
+    python -m benchmarks.run --out report.json
+    python -m benchmarks.run --scenario command_latency --set transport=serial
+    python -m benchmarks.run --compare base.json new.json
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from utils import config
+from benchmarks.scenarios import SCENARIOS
+
+# Config values that change what the scenarios measure; recorded in every report
+REPORTED_CONFIG = (
+    "CAMERA_TARGET_FPS", "INFERENCE_ENGINE", "DETECTOR_BACKEND", "DETECTOR_IMGSZ",
+    "MOTION_GATE_ENABLED", "TRACKING_ENABLED", "DETECT_EVERY_N_FRAMES",
+    "GOVERNOR_ENABLED", "INFERENCE_LATENCY_BUDGET_MS", "CPU_BUDGET",
+    "TELEMETRY_MAX_RATE", "TELEMETRY_CLIENT_QUEUE",
+)
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return None
+
+
+def _meta():
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "describe": _git("describe", "--always", "--dirty"),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": {name: getattr(config, name, None) for name in REPORTED_CONFIG},
+    }
+
+
+def _parse_value(text):
+    # Numbers / booleans / lists as JSON, anything else (including "null") as a string
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return text
+    return text if value is None else value
+
+
+def run(names, params):
+    results = {}
+    for name in names:
+        kwargs = params.get(name, {})
+        print(f"[bench] {name} {kwargs or ''}")
+        t0 = time.monotonic()
+        try:
+            results[name] = SCENARIOS[name](**kwargs)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        results[name]["params"] = kwargs
+        results[name]["wall_s"] = time.monotonic() - t0
+    return {"meta": _meta(), "results": results}
+
+
+def _flatten(d, prefix=""):
+    out = {}
+    for key, value in d.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[path] = value
+    return out
+
+
+def compare(base, new):
+    """Print every numeric result present in both reports with its relative change."""
+    a, b = _flatten(base["results"]), _flatten(new["results"])
+    print(f"base: {base['meta'].get('describe')}  new: {new['meta'].get('describe')}")
+    width = max((len(k) for k in a), default=10)
+    for key in sorted(a.keys() & b.keys()):
+        if ".params." in key or key.endswith("wall_s"):
+            continue
+        old, cur = a[key], b[key]
+        change = f"{(cur - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key:<{width}}  {old:>12.3f}  {cur:>12.3f}  {change:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DOBI offline benchmarks")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--set", action="append", default=[], metavar="[SCENARIO.]KEY=VALUE",
+                        help="scenario parameter, e.g. duration=5 or ws_throughput.clients=50")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="compare two reports")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f1, open(args.compare[1]) as f2:
+            compare(json.load(f1), json.load(f2))
+        return 0
+
+    names = args.scenario or list(SCENARIOS)
+    params = {name: {} for name in names}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        scenario, _, key = key.rpartition(".")
+        for name in ([scenario] if scenario else names):
+            # Unscoped keys only go to the scenarios that take them
+            if name in params and key in inspect.signature(SCENARIOS[name]).parameters:
+                params[name][key] = _parse_value(value)
+
+    report = run(names, params)
+    text = json.dumps(report, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"[bench] report written to {args.out}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+# benchmarks/scenarios.py
+"""
+Benchmark scenarios. Each one takes keyword parameters, runs against the
+stand-ins and returns a JSON-serializable dict of results.
+"""
+
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+
+from utils import metrics
+
+try:
+    import websocket
+except Exception:
+    websocket = None
+
+
+def _percentiles(samples_ms):
+    if not samples_ms:
+        return {"count": 0}
+    a = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(a.size),
+        "mean_ms": float(a.mean()),
+        "p50_ms": float(np.percentile(a, 50)),
+        "p95_ms": float(np.percentile(a, 95)),
+        "p99_ms": float(np.percentile(a, 99)),
+        "max_ms": float(a.max()),
+    }
+
+
+def _histogram_window(hist, before):
+    """p50/p95 (bucket upper bounds, ms) of a metrics.Histogram since the `before` cumulative counts."""
+    after = hist.cumulative()
+    delta = [a - b for a, b in zip(after, before)]
+    total = delta[-1]
+    out = {"count": total}
+    bounds = hist.bounds + (float("inf"),)
+    for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+        out[name] = next((b * 1000.0 for b, n in zip(bounds, delta) if total and n >= q * total), None)
+    return out
+
+
+# --- camera pipeline -------------------------------------------------------
+
+def _camera_totals(ch, names):
+    totals = {}
+    for name in names:
+        for key, value in ch.get_camera_stats(name).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def inference_fps(duration=10.0, source="synthetic", detector="yolo", target_fps=0,
+                  capture_fps=30, width=640, height=480, render=True, warmup_timeout=120.0,
+                  cameras=1):
+    """
+    Run the camera pipeline on a synthetic (or video-file) source and measure
+    capture / inference / output FPS and per-stage latencies.
+    detector="null" skips YOLO to measure the pipeline's own overhead.
+    cameras > 1 adds synthetic cameras next to the default one (batched inference);
+    frame counts are summed over all of them.
+    """
+    from benchmarks.sources import SyntheticCapture, VideoFileCapture
+    from camera import camera_handler as ch
+    from camera.detections import Detections
+
+    cap = (SyntheticCapture(width, height, fps=capture_fps) if source == "synthetic"
+           else VideoFileCapture(source, fps=capture_fps or None))
+    caps = {ch.DEFAULT_CAMERA: cap}
+    for i in range(1, cameras):
+        name = f"bench{i}"
+        if name not in ch.cameras:
+            ch.add_camera(name, location=f"Bench {i}")
+        caps[name] = SyntheticCapture(width, height, fps=capture_fps, seed=i)
+    # Benchmark knob: 0 lets inference run as fast as it can
+    ch.CAMERA_TARGET_FPS = target_fps
+
+    threads = []
+    if detector == "null":
+        def null_detect(frames, **kwargs):
+            return [Detections.empty() for _ in frames], 0.0
+        running = threading.Event()
+        running.set()
+        stop = running.clear
+        for name, c in caps.items():
+            threads.append(threading.Thread(target=ch.capture_loop, args=(running, c, ch.get_camera(name)),
+                                            daemon=True))
+        threads.append(threading.Thread(
+            target=ch.inference_loop,
+            args=(running, lambda *a, **k: None, [ch.get_camera(n) for n in caps]),
+            kwargs={"detect": null_detect}, daemon=True))
+        for t in threads:
+            t.start()
+    else:
+        stop = ch.stop_camera
+        if not ch.start_camera(lambda *a, **k: None, source=caps):
+            return {"error": "previous camera run did not stop"}
+
+    # Wait until the detector is loaded and frames come out
+    deadline = time.monotonic() + warmup_timeout
+    while _camera_totals(ch, caps).get("inferred", 0) == 0 and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if _camera_totals(ch, caps).get("inferred", 0) == 0:
+        stop()
+        return {"error": "no frames inferred before warmup_timeout"}
+
+    stages = {
+        stage: metrics.histogram("camera_stage_seconds", labels={"stage": stage})
+        for stage in ("capture", "inference", "render", "capture_to_publish")
+    }
+    before_hist = {k: h.cumulative() for k, h in stages.items()}
+    before = _camera_totals(ch, caps)
+    batches_before = metrics.counter("camera_inference_batches_total").value
+    t0 = time.monotonic()
+    cpu0 = time.process_time()
+
+    viewer_stop = threading.Event()
+    def viewer():
+        # One UI client pulling annotated frames, so rendering is exercised
+        last = None
+        while not viewer_stop.is_set():
+            last, _ = ch.wait_for_frame(last, timeout=0.5)
+    viewer_thread = threading.Thread(target=viewer, daemon=True)
+    if render:
+        viewer_thread.start()
+
+    time.sleep(duration)
+    elapsed = time.monotonic() - t0
+    cpu = time.process_time() - cpu0
+    after = _camera_totals(ch, caps)
+    batches = metrics.counter("camera_inference_batches_total").value - batches_before
+    viewer_stop.set()
+    stop()
+    for t in threads:
+        t.join(timeout=2.0)
+    for c in caps.values():
+        c.release()
+
+    rate = lambda key: (after[key] - before[key]) / elapsed
+    return {
+        "capture_fps": rate("captured"),
+        "inference_fps": rate("inferred"),
+        "output_fps": rate("inferred") + rate("reused") + rate("tracked"),
+        "reused_fps": rate("reused"),
+        "tracked_fps": rate("tracked"),
+        "dropped_capture": after["capture_dropped"] - before["capture_dropped"],
+        "cpu_utilization": cpu / elapsed,
+        "stages": {k: _histogram_window(h, before_hist[k]) for k, h in stages.items()},
+        "cameras": len(caps),
+        "detector_calls_per_s": batches / elapsed,
+        "governor": ch.governor.stats(),
+    }
+
+
+# --- bridge ----------------------------------------------------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BridgeHarness:
+    """
+    Runs bridge.server's app in-process on a free port with `comm` in place
+    of the CommHandler it would build on startup.
+    """
+
+    def __init__(self, comm):
+        self.comm = comm
+        self.port = _free_port()
+        self.url = f"ws://127.0.0.1:{self.port}/ws"
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        import uvicorn
+        from bridge import server as srv
+
+        srv.init(self.comm)
+        self.server_module = srv
+
+        config = uvicorn.Config(srv.app, host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        # Serving from a worker thread: leave signal handling to the main program
+        self._server.install_signal_handlers = lambda: None
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10.0
+        while not self._server.started and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if not self._server.started:
+            raise RuntimeError("bridge did not start")
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5.0)
+
+    def connect(self, binary=True):
+        from bridge.protocol import BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL
+        ws = websocket.WebSocket()
+        ws.connect(self.url, timeout=5,
+                   subprotocols=[BINARY_SUBPROTOCOL if binary else JSON_SUBPROTOCOL])
+        return ws
+
+
+def _make_comm(transport, ros_rates=None, esp_rate=50):
+    from bridge.comm_handler import CommHandler
+    from benchmarks.fake_esp import FakeEsp
+    from benchmarks.fake_ros import FakeRosNodeHandler
+
+    esp = None
+    if transport == "serial":
+        esp = FakeEsp(line_rate=esp_rate)
+        comm = CommHandler(mode="serial", serial_port=esp.port)
+    else:
+        comm = CommHandler(mode="ros", ros_factory=lambda: FakeRosNodeHandler(ros_rates))
+    # Let the supervisor bring the link up
+    deadline = time.monotonic() + 5.0
+    while not all(s["state"] == "up" for s in comm.link_state().values()):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{transport} stand-in did not connect")
+        time.sleep(0.02)
+    return comm, esp
+
+
+def _send(ws, payload, binary):
+    from bridge.protocol import encode_client_message
+    if binary:
+        ws.send_binary(encode_client_message(payload))
+    else:
+        ws.send(json.dumps(payload))
+
+
+def command_latency(count=200, transport="ros", binary=True, timeout=1.0):
+    """
+    End-to-end latency of drive commands: /ws send -> dispatcher ->
+    CommHandler.publish_command -> fake ROS node / fake ESP receive.
+    Commands go out one at a time, so this is latency, not throughput.
+    """
+    if websocket is None:
+        return {"error": "websocket-client not installed"}
+    comm, esp = _make_comm(transport, ros_rates={})
+    commands = ("forward", "left", "right", "backward")
+    latencies, lost = [], 0
+    try:
+        with BridgeHarness(comm) as bridge:
+            ws = bridge.connect(binary)
+            for i in range(count):
+                if transport == "serial":
+                    seen = len(esp.received)
+                    t0 = time.monotonic()
+                    _send(ws, {"type": "command", "data": commands[i % len(commands)]}, binary)
+                    got = esp.wait_for_bytes(seen, timeout)
+                else:
+                    ros = comm.ros
+                    seen = len(ros.commands)
+                    t0 = time.monotonic()
+                    _send(ws, {"type": "command", "data": commands[i % len(commands)]}, binary)
+                    got = ros.wait_for_command(seen, timeout)
+                if got is None:
+                    lost += 1
+                else:
+                    latencies.append((got[0] - t0) * 1000.0)
+            ws.close()
+            dispatch = bridge.server_module.dispatcher.stats()
+    finally:
+        comm.close()
+        if esp:
+            esp.close()
+    return dict(_percentiles(latencies), lost=lost, transport=transport, binary=binary,
+                dispatcher_avg_ms=dispatch["avg_latency_ms"])
+
+
+def ws_throughput(clients=10, duration=10.0, binary=True, imu_rate=200, ultrasonic_rate=20):
+    """
+    Telemetry fan-out with N concurrent /ws clients while the fake ROS node
+    publishes at the given rates. Measures delivered messages per client and
+    process CPU (bridge and clients share the process).
+    """
+    if websocket is None:
+        return {"error": "websocket-client not installed"}
+    rates = {"imu": imu_rate, "ultrasonic_left": ultrasonic_rate, "ultrasonic_right": ultrasonic_rate}
+    comm, _ = _make_comm("ros", ros_rates=rates)
+    stop = threading.Event()
+    counts = [0] * clients
+    sizes = [0] * clients
+
+    def client(i, ws):
+        ws.settimeout(0.5)
+        while not stop.is_set():
+            try:
+                msg = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                continue
+            except Exception:
+                return
+            counts[i] += 1
+            sizes[i] += len(msg)
+
+    try:
+        with BridgeHarness(comm) as bridge:
+            sockets = [bridge.connect(binary) for _ in range(clients)]
+            threads = [threading.Thread(target=client, args=(i, ws), daemon=True)
+                       for i, ws in enumerate(sockets)]
+            for t in threads:
+                t.start()
+            time.sleep(1.0)   # settle
+            start_counts = list(counts)
+            t0, cpu0 = time.monotonic(), time.process_time()
+            broadcaster = bridge.server_module.telemetry
+            sent0, dropped0 = broadcaster.sent, broadcaster.dropped
+            time.sleep(duration)
+            elapsed = time.monotonic() - t0
+            cpu = time.process_time() - cpu0
+            sent, dropped = broadcaster.sent - sent0, broadcaster.dropped - dropped0
+            stop.set()
+            for ws in sockets:
+                ws.close()
+            for t in threads:
+                t.join(timeout=1.0)
+    finally:
+        comm.close()
+
+    per_client = [(c - s) / elapsed for c, s in zip(counts, start_counts)]
+    return {
+        "clients": clients,
+        "binary": binary,
+        "msgs_per_client_per_s": {
+            "min": min(per_client), "mean": sum(per_client) / clients, "max": max(per_client),
+        },
+        "total_msgs_per_s": sum(per_client),
+        "avg_message_bytes": sum(sizes) / max(1, sum(counts)),
+        "broadcaster_sent_per_s": sent / elapsed,
+        "broadcaster_dropped": dropped,
+        "cpu_utilization": cpu / elapsed,
+    }
+
+
+SCENARIOS = {
+    "inference_fps": inference_fps,
+    "command_latency": command_latency,
+    "ws_throughput": ws_throughput,
+}
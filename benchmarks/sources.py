@@ -0,0 +1,116 @@
+# benchmarks/sources.py
+"""
+cv2.VideoCapture stand-ins for camera_handler (pass one as start_camera's
+source). Both are deterministic so runs can be compared between commits.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+class _Paced:
+    def __init__(self, fps):
+        self._period = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = None
+
+    def wait(self):
+        # Behave like a device: a frame is ready every period, reads block until then
+        if not self._period:
+            return
+        now = time.monotonic()
+        if self._next is None or self._next < now - self._period:
+            self._next = now
+        delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next += self._period
+
+
+class SyntheticCapture:
+    """
+    Generated BGR frames: a fixed textured background with `objects`
+    rectangles moving across it, delivered at `fps` (0 = as fast as read).
+    Stops returning frames after `frames` reads if given.
+    """
+
+    def __init__(self, width=640, height=480, fps=30, objects=3, frames=None, seed=0):
+        self.width, self.height = width, height
+        self.fps = fps
+        self._frames = frames
+        self._count = 0
+        self._pace = _Paced(fps)
+        rng = np.random.default_rng(seed)
+        # Low-contrast noise so the motion gate sees only the moving boxes
+        self._base = rng.integers(90, 110, size=(height, width, 3), dtype=np.uint8)
+        self._objects = [
+            (rng.integers(0, width), rng.integers(0, height),
+             rng.integers(40, 120), rng.integers(60, 200),
+             rng.uniform(-6, 6), rng.uniform(-4, 4),
+             tuple(int(c) for c in rng.integers(0, 255, 3)))
+            for _ in range(objects)
+        ]
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FPS: float(self.fps),
+            cv2.CAP_PROP_FRAME_WIDTH: float(self.width),
+            cv2.CAP_PROP_FRAME_HEIGHT: float(self.height),
+        }.get(prop, 0.0)
+
+    def read(self):
+        if not self._open or (self._frames is not None and self._count >= self._frames):
+            return False, None
+        self._pace.wait()
+        frame = self._base.copy()
+        t = self._count
+        for x, y, w, h, vx, vy, color in self._objects:
+            # Bounce inside the frame
+            px = int(abs((x + vx * t) % (2 * self.width) - self.width))
+            py = int(abs((y + vy * t) % (2 * self.height) - self.height))
+            cv2.rectangle(frame, (px, py), (px + int(w), py + int(h)), color, -1)
+        self._count += 1
+        return True, frame
+
+    def release(self):
+        self._open = False
+
+
+class VideoFileCapture:
+    """Plays a video file in a loop at `fps` (default: the file's own rate)."""
+
+    def __init__(self, path, fps=None, loop=True):
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise IOError(f"cannot open video {path}")
+        self.fps = fps if fps is not None else (self._cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        self._loop = loop
+        self._pace = _Paced(self.fps)
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def read(self):
+        self._pace.wait()
+        ok, frame = self._cap.read()
+        if not ok and self._loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read()
+        return ok, frame
+
+    def release(self):
+        self._cap.release()
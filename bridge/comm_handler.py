@@ -0,0 +1,373 @@
+# bridge/comm_handler.py
+import time
+from utils.config import (
+    CONTROL_MODE, SERIAL_PORT, BAUD_RATE, COMMAND_MAP, SERIAL_MAX_LINE,
+    TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES,
+    TRANSPORT_BACKOFF_INITIAL, TRANSPORT_BACKOFF_MAX, TRANSPORT_CHECK_INTERVAL,
+    TRANSPORT_COMMAND_MAX_AGE,
+)
+from threading import Lock, Thread
+
+# Optional serial import
+try:
+    import serial
+except Exception:
+    serial = None
+
+# Optional ROS import (serial-only setups and offline benchmarks run without it)
+try:
+    from .ros_node import RosNodeHandler
+except Exception:
+    RosNodeHandler = None
+from .serial_protocol import parse_line
+from .telemetry_state import TelemetryState
+from .transport import TransportSupervisor
+from utils import metrics
+
+_serial_bytes = metrics.counter("serial_bytes_read_total", "Bytes read from the ESP serial port")
+_serial_lines = metrics.counter("serial_lines_total", "Telemetry lines parsed from serial")
+_serial_errors = metrics.counter("serial_parse_errors_total", "Unparseable serial lines")
+
+class SerialHandler:
+    def __init__(self, port, baud):
+        self._port = port
+        self._baud = baud
+        self._ser = None
+        self._lock = Lock()
+        # Parsed telemetry, same storage and schema as the ROS node
+        self.telemetry = TelemetryState(TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES)
+        self._listeners = []
+        self._running = False
+        self._reader = None
+        self.bytes_read = 0
+        self.lines = 0
+        self.parse_errors = 0
+        self.last_line_time = None
+        try:
+            self.open()
+        except Exception as e:
+            print("[SerialHandler] open failed:", e)
+
+    def open(self):
+        """Open the port and start the reader; raises on failure. No-op when already open."""
+        if self.connected:
+            return self
+        if serial is None:
+            raise RuntimeError("pyserial not installed")
+        ser = serial.Serial(self._port, self._baud, timeout=0.1)
+        print(f"[SerialHandler] opened {self._port} @ {self._baud}")
+        with self._lock:
+            self._ser = ser
+        self._running = True
+        self._reader = Thread(target=self._read_loop, args=(ser,), daemon=True)
+        self._reader.start()
+        return self
+
+    @property
+    def connected(self):
+        return self._ser is not None and self._reader is not None and self._reader.is_alive()
+
+    def disconnect(self):
+        """Drop the port (e.g. after an I/O error); open() may be called again later."""
+        with self._lock:
+            ser, self._ser = self._ser, None
+        try:
+            if ser:
+                ser.close()
+        except Exception:
+            pass
+
+    def add_listener(self, fn):
+        """fn() is called from the reader thread after each parsed line."""
+        self._listeners.append(fn)
+
+    def _read_loop(self, ser):
+        buf = bytearray()
+        while self._running and ser is self._ser:
+            try:
+                # Take everything the OS has buffered; block briefly (port timeout) when idle
+                chunk = ser.read(ser.in_waiting or 1)
+            except Exception as e:
+                # Unplugged / ESP reset: give the port up, the supervisor reopens it
+                if self._running and ser is self._ser:
+                    print("[SerialHandler] read error:", e)
+                    self.disconnect()
+                return
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            _serial_bytes.inc(len(chunk))
+            buf += chunk
+            *lines, rest = buf.split(b"\n")
+            buf = bytearray(rest)
+            if len(buf) > SERIAL_MAX_LINE:
+                buf.clear()
+                self.parse_errors += 1
+                _serial_errors.inc()
+            if lines:
+                self._handle_lines(lines)
+
+    def _handle_lines(self, lines):
+        stamp = time.time()
+        updated = False
+        for raw in lines:
+            try:
+                samples = parse_line(raw.decode(errors="ignore"))
+            except ValueError:
+                self.parse_errors += 1
+                _serial_errors.inc()
+                continue
+            if not samples:
+                continue
+            self.lines += 1
+            _serial_lines.inc()
+            for topic, values in samples:
+                self.telemetry.update(topic, values, stamp)
+            updated = True
+        if updated:
+            self.last_line_time = stamp
+            # One notification per read chunk, however many lines it held
+            for fn in self._listeners:
+                try:
+                    fn()
+                except Exception as e:
+                    print("[SerialHandler] listener error:", e)
+
+    def write(self, s):
+        if self._ser is None:
+            return False
+        try:
+            payload = s
+            if isinstance(payload, str):
+                # send newline terminated (ESP code reads single chars, newline is okay)
+                b = (payload).encode()
+            else:
+                b = payload
+            with self._lock:
+                self._ser.write(b)
+            return True
+        except Exception as e:
+            print("[SerialHandler] write error:", e)
+            self.disconnect()
+            return False
+
+    def read_latest(self):
+        """Newest parsed telemetry dict, or None until a line has been parsed."""
+        if self._ser is None or self.last_line_time is None:
+            return None
+        return self.telemetry.to_dict()
+
+    def get_history(self, topic, seconds=None, start=None):
+        return self.telemetry.history(topic, seconds, start)
+
+    def stats(self):
+        return {
+            "bytes_read": self.bytes_read,
+            "lines": self.lines,
+            "parse_errors": self.parse_errors,
+            "last_line_time": self.last_line_time,
+        }
+
+    def close(self):
+        self._running = False
+        self.disconnect()
+        if self._reader:
+            self._reader.join(timeout=1.0)
+
+def _ros_command(ros, payload):
+    ros.publish_command(payload)
+
+def _ros_mode(ros, mode_str):
+    ros.publish_mode(mode_str)
+
+class CommHandler:
+    def __init__(self, mode=None, ros_factory=None, serial_port=None, baud=None):
+        """
+        Defaults come from utils.config. ros_factory() builds the ROS side
+        (RosNodeHandler unless a stand-in is given, e.g. by the benchmarks).
+        """
+        mode = CONTROL_MODE if mode is None else mode
+        ros_factory = ros_factory or RosNodeHandler
+        self._ros_link = None
+        self._serial_link = None
+        self.serial = None
+        self._listeners = []
+        self._telemetry_sinks = []
+        # sink(kind, value) sees every command / mode sent to the hardware
+        self.command_sinks = []
+        self._listening_ros = None
+        self._lock = Lock()
+
+        # Each transport is owned by a supervisor that keeps reconnecting it
+        if mode in ("ros", "both") and ros_factory is None:
+            print("[CommHandler] rclpy not available, ROS transport disabled")
+        elif mode in ("ros", "both"):
+            self._ros_link = TransportSupervisor(
+                "ros", ros_factory,
+                is_alive=lambda ros: ros.alive(),
+                disconnect=lambda ros: ros.shutdown(),
+                on_connect=self._attach_ros_listeners,
+                **self._supervisor_settings())
+            self._ros_link.start()
+
+        if mode in ("serial", "both"):
+            # The handler outlives reconnects so its telemetry history is kept
+            self.serial = SerialHandler(serial_port or SERIAL_PORT, baud or BAUD_RATE)
+            self._serial_link = TransportSupervisor(
+                "serial", self.serial.open,
+                is_alive=lambda ser: ser.connected,
+                disconnect=lambda ser: ser.disconnect(),
+                **self._supervisor_settings())
+            self._serial_link.start()
+
+        for name, link in (("ros", self._ros_link), ("serial", self._serial_link)):
+            if link:
+                metrics.gauge("transport_link_up", "1 while the hardware link is connected",
+                              {"link": name}, fn=lambda link=link: int(link.connected))
+                metrics.counter("transport_reconnects_total", "Hardware link reconnects",
+                                {"link": name}, fn=lambda link=link: link.reconnects)
+
+    def _supervisor_settings(self):
+        return {
+            "backoff_initial": TRANSPORT_BACKOFF_INITIAL,
+            "backoff_max": TRANSPORT_BACKOFF_MAX,
+            "check_interval": TRANSPORT_CHECK_INTERVAL,
+            "command_max_age": TRANSPORT_COMMAND_MAX_AGE,
+            "stop_value": self._map("stop"),
+        }
+
+    @property
+    def ros(self):
+        """The connected RosNodeHandler, or None while ROS is down."""
+        return self._ros_link.link if self._ros_link else None
+
+    def _attach_ros_listeners(self, ros):
+        # A reconnect brings up a fresh node
+        with self._lock:
+            for fn in self._listeners:
+                ros.add_listener(fn)
+            ros.telemetry.sinks.extend(self._telemetry_sinks)
+            self._listening_ros = ros
+
+    def _map(self, cmd):
+        if isinstance(COMMAND_MAP, dict):
+            return COMMAND_MAP.get(cmd, cmd)
+        return cmd
+
+    def publish_command(self, logical_cmd):
+        """
+        logical_cmd: e.g. "forward", "left"
+        """
+        self._record_command("command", logical_cmd)
+        mapped = self._map(logical_cmd)
+        # If mapped is multi-char, take first char for compatibility.
+        if isinstance(mapped, str) and len(mapped) > 1:
+            mapped_payload = mapped[0]
+        else:
+            mapped_payload = mapped
+
+        # ROS path (publish std_msgs/Char); buffered while the link is down
+        if self._ros_link:
+            self._ros_link.send("command", mapped_payload, _ros_command)
+
+        # Serial fallback
+        if self._serial_link:
+            # Write char (no newline needed; but allowed)
+            self._serial_link.send("command", mapped_payload, SerialHandler.write)
+
+    def publish_mode(self, mode_str):
+        # Publish mode string to ROS (and serial as fallback)
+        self._record_command("mode", mode_str)
+        if self._ros_link:
+            self._ros_link.send("mode", mode_str, _ros_mode)
+        if self._serial_link:
+            # serial mode switch protocol is project dependent — many setups ignore it
+            self._serial_link.send("mode", mode_str + "\n", SerialHandler.write)
+
+    def link_state(self):
+        """Per-transport link state, reconnect counts and buffered commands."""
+        state = {}
+        if self._ros_link:
+            state["ros"] = self._ros_link.stats()
+        if self._serial_link:
+            state["serial"] = dict(self._serial_link.stats(), **self.serial.stats())
+        return state
+
+    def add_telemetry_listener(self, fn):
+        """
+        Register fn() to be called (from a transport thread) whenever new
+        telemetry arrives. Returns False if no transport can push updates,
+        in which case consumers have to poll get_latest_data().
+        """
+        pushed = False
+        if self._ros_link:
+            with self._lock:
+                self._listeners.append(fn)
+                if self._listening_ros:
+                    self._listening_ros.add_listener(fn)
+            pushed = True
+        if self.serial:
+            self.serial.add_listener(fn)
+            pushed = True
+        return pushed
+
+    def add_telemetry_sink(self, sink):
+        """sink(topic, stamp, values) is called for every telemetry sample, from any transport."""
+        with self._lock:
+            self._telemetry_sinks.append(sink)
+            if self._listening_ros:
+                self._listening_ros.telemetry.sinks.append(sink)
+        if self.serial:
+            self.serial.telemetry.sinks.append(sink)
+
+    def remove_telemetry_sink(self, sink):
+        with self._lock:
+            if sink in self._telemetry_sinks:
+                self._telemetry_sinks.remove(sink)
+            states = [r.telemetry for r in (self._listening_ros, self.serial) if r]
+        for state in states:
+            if sink in state.sinks:
+                state.sinks.remove(sink)
+
+    def _record_command(self, kind, value):
+        for sink in self.command_sinks:
+            try:
+                sink(kind, value)
+            except Exception as e:
+                print("[CommHandler] command sink error:", e)
+
+    def get_history(self, topic, seconds=None, start=None):
+        """Recent (stamps, values) samples for a telemetry topic, or None if unavailable."""
+        if self.ros:
+            try:
+                return self.ros.get_history(topic, seconds, start)
+            except Exception as e:
+                print("[CommHandler] get_history ros error:", e)
+        if self.serial:
+            return self.serial.get_history(topic, seconds, start)
+        return None
+
+    def get_latest_data(self):
+        # Prefer ROS telemetry
+        if self.ros:
+            try:
+                d = self.ros.get_latest_data()
+                if d is not None:
+                    return d
+            except Exception as e:
+                print("[CommHandler] get_latest_data ros error:", e)
+        # Fall back to serial reads
+        if self.serial:
+            return self.serial.read_latest()
+        return None
+
+    def close(self):
+        if self._ros_link:
+            self._ros_link.stop()
+        if self._serial_link:
+            self._serial_link.stop()
+        if self.serial:
+            try:
+                self.serial.close()
+            except:
+                pass
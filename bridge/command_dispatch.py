@@ -0,0 +1,142 @@
+# bridge/command_dispatch.py
+"""
+Command dispatch stage between the WebSocket handlers and the hardware.
+Handlers only enqueue (never blocking the event loop); a writer thread calls
+CommHandler, which may block on the serial port. Drive commands are
+latest-wins: a newer one replaces any drive command still waiting. Stops
+are never coalesced away and always go out before anything else.
+"""
+
+import threading
+import time
+from collections import deque
+
+from utils import metrics
+
+STOP_COMMAND = "stop"
+
+
+class Command:
+    __slots__ = ("kind", "value", "received")
+
+    def __init__(self, kind, value, received=None):
+        self.kind = kind            # "command" or "mode"
+        self.value = value
+        self.received = time.monotonic() if received is None else received
+
+
+class CommandDispatcher:
+    def __init__(self, comm):
+        self._comm = comm
+        self._cond = threading.Condition()
+        self._stops = deque()
+        self._modes = deque()
+        self._drive = None
+        self._running = False
+        self._thread = None
+        self.dispatched = 0
+        self.coalesced = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self._latency_total_ms = 0.0
+        self._latency = {
+            kind: metrics.histogram("bridge_command_latency_seconds",
+                                    "Receive-to-publish time of UI commands", {"kind": kind})
+            for kind in ("command", "mode")
+        }
+        self._coalesced = metrics.counter("bridge_commands_coalesced_total",
+                                          "Drive commands replaced before dispatch")
+        metrics.gauge("bridge_command_queue_depth", "Commands waiting for the writer thread",
+                      fn=self.queue_depth)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    # --- producers (event loop side) -------------------------------------
+
+    def submit_command(self, logical_cmd, received=None):
+        cmd = Command("command", logical_cmd, received)
+        with self._cond:
+            if logical_cmd == STOP_COMMAND:
+                # A stop makes any waiting drive command obsolete
+                if self._drive is not None:
+                    self._drive = None
+                    self.coalesced += 1
+                    self._coalesced.inc()
+                self._stops.append(cmd)
+            else:
+                if self._drive is not None:
+                    self.coalesced += 1
+                    self._coalesced.inc()
+                self._drive = cmd
+            self._cond.notify()
+
+    def submit_mode(self, mode_str, received=None):
+        with self._cond:
+            self._modes.append(Command("mode", mode_str, received))
+            self._cond.notify()
+
+    # --- writer thread ---------------------------------------------------
+
+    def _next(self):
+        # Priority: stop > mode > drive
+        if self._stops:
+            return self._stops.popleft()
+        if self._modes:
+            return self._modes.popleft()
+        cmd, self._drive = self._drive, None
+        return cmd
+
+    def _pending(self):
+        return bool(self._stops or self._modes or self._drive is not None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending() or not self._running)
+                if not self._running and not self._pending():
+                    return
+                cmd = self._next()
+            try:
+                if cmd.kind == "mode":
+                    self._comm.publish_mode(cmd.value)
+                else:
+                    self._comm.publish_command(cmd.value)
+            except Exception as e:
+                print("[CommandDispatcher] dispatch error:", e)
+            self._record(cmd)
+
+    def _record(self, cmd):
+        latency = time.monotonic() - cmd.received
+        self._latency[cmd.kind].observe(latency)
+        latency_ms = latency * 1000.0
+        self.dispatched += 1
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self._latency_total_ms += latency_ms
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._stops) + len(self._modes) + (self._drive is not None)
+
+    def stats(self):
+        avg = self._latency_total_ms / self.dispatched if self.dispatched else 0.0
+        return {
+            "dispatched": self.dispatched,
+            "coalesced": self.coalesced,
+            "queue_depth": self.queue_depth(),
+            "last_latency_ms": self.last_latency_ms,
+            "avg_latency_ms": avg,
+            "max_latency_ms": self.max_latency_ms,
+        }
@@ -0,0 +1,80 @@
+# bridge/downsample.py
+"""
+Server-side downsampling of telemetry series for charts.
+Both methods keep the output at a fixed small size no matter how many raw
+samples are in the window.
+"""
+
+import numpy as np
+
+
+def _clean(t, v):
+    t = np.asarray(t, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    keep = np.isfinite(v)
+    return t[keep], v[keep]
+
+
+def _first_per_bucket(hits, bucket_of):
+    # hits is sorted, so bucket ids along it are non-decreasing
+    b = bucket_of[hits]
+    return hits[np.r_[True, b[1:] != b[:-1]]]
+
+
+def minmax(t, v, points):
+    """
+    Min/max bucketing: split the series into points // 2 buckets and keep the
+    minimum and maximum sample of each (in time order). Fully vectorized.
+    """
+    t, v = _clean(t, v)
+    n = len(v)
+    if n <= points or points < 2:
+        return t, v
+    buckets = points // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+
+    lo = np.minimum.reduceat(v, starts)
+    hi = np.maximum.reduceat(v, starts)
+    # First index in each bucket holding its min / max
+    lo_idx = _first_per_bucket(np.flatnonzero(v == lo[bucket_of]), bucket_of)
+    hi_idx = _first_per_bucket(np.flatnonzero(v == hi[bucket_of]), bucket_of)
+
+    idx = np.unique(np.concatenate([lo_idx, hi_idx]))
+    return t[idx], v[idx]
+
+
+def lttb(t, v, points):
+    """
+    Largest-Triangle-Three-Buckets: keeps the visually most significant point
+    per bucket. Bucket averages are computed in one vectorized pass; the
+    selection walks the buckets because each pick depends on the previous one.
+    """
+    t, v = _clean(t, v)
+    n = len(v)
+    if n <= points or points < 3:
+        return t, v
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = np.maximum(ends - starts, 1)
+    avg_t = np.add.reduceat(t[:n - 1], starts) / sizes
+    avg_v = np.add.reduceat(v[:n - 1], starts) / sizes
+    # The "next bucket average" for the last bucket is the final point
+    next_t = np.append(avg_t[1:], t[-1])
+    next_v = np.append(avg_v[1:], v[-1])
+
+    idx = np.empty(points, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range(points - 2):
+        s, e = starts[b], max(ends[b], starts[b] + 1)
+        bt, bv = t[s:e], v[s:e]
+        area = np.abs((t[a] - next_t[b]) * (bv - v[a]) - (t[a] - bt) * (next_v[b] - v[a]))
+        a = s + int(np.argmax(area))
+        idx[b + 1] = a
+    return t[idx], v[idx]
+
+
+METHODS = {"minmax": minmax, "lttb": lttb}
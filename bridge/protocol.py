@@ -0,0 +1,151 @@
+# bridge/protocol.py
+"""
+Wire formats for bridge <-> UI messages.
+JSON text stays the default. A client that offers the BINARY_SUBPROTOCOL
+WebSocket subprotocol at connect time gets telemetry as fixed-layout struct
+frames instead (60 bytes for ultrasonic + full IMU) and may send commands in
+binary as well.
+"""
+
+import json
+import struct
+import time
+
+JSON_SUBPROTOCOL = "dobi.json.v1"
+BINARY_SUBPROTOCOL = "dobi.bin.v1"
+
+MSG_TELEMETRY = 1
+MSG_COMMAND = 2
+MSG_MODE = 3
+
+# Telemetry frame:
+#   B  message type (MSG_TELEMETRY)
+#   B  layout version
+#   H  presence flags (FLAG_*)
+#   d  bridge timestamp (epoch seconds)
+#   2f ultrasonic left / right (cm)
+#   4f orientation x, y, z, w
+#   3f angular velocity x, y, z
+#   3f linear acceleration x, y, z
+TELEMETRY_STRUCT = struct.Struct("<BBHd2f4f3f3f")
+TELEMETRY_VERSION = 1
+FLAG_ULTRA_LEFT = 1 << 0
+FLAG_ULTRA_RIGHT = 1 << 1
+FLAG_IMU = 1 << 2
+
+# Client -> bridge: B message type, then the UTF-8 command / mode string
+CLIENT_HEADER = struct.Struct("<B")
+_CLIENT_KINDS = {MSG_COMMAND: "command", MSG_MODE: "mode"}
+
+_AXES3 = ("x", "y", "z")
+_AXES4 = ("x", "y", "z", "w")
+_NAN = float("nan")
+
+
+def negotiate(offered):
+    """Pick the subprotocol for a connection from the client's offer (None = legacy JSON)."""
+    if BINARY_SUBPROTOCOL in offered:
+        return BINARY_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in offered:
+        return JSON_SUBPROTOCOL
+    return None
+
+
+def encode_json(data):
+    return json.dumps({"type": "telemetry", "data": data}, default=str)
+
+
+def _vec(d, axes):
+    if not isinstance(d, dict):
+        return (_NAN,) * len(axes)
+    return tuple(float(d.get(a, _NAN)) for a in axes)
+
+
+def _num(v):
+    return _NAN if v is None else float(v)
+
+
+def encode_telemetry(data, stamp=None):
+    """
+    Pack the ultrasonic_left/right + imu telemetry dict into a binary frame.
+    Returns None for anything that doesn't fit the layout (send JSON instead).
+    """
+    if not isinstance(data, dict):
+        return None
+    try:
+        ul = data.get("ultrasonic_left")
+        ur = data.get("ultrasonic_right")
+        imu = data.get("imu")
+        flags = ((FLAG_ULTRA_LEFT if ul is not None else 0)
+                 | (FLAG_ULTRA_RIGHT if ur is not None else 0)
+                 | (FLAG_IMU if imu else 0))
+        imu = imu or {}
+        return TELEMETRY_STRUCT.pack(
+            MSG_TELEMETRY, TELEMETRY_VERSION, flags,
+            time.time() if stamp is None else stamp,
+            _num(ul), _num(ur),
+            *_vec(imu.get("orientation"), _AXES4),
+            *_vec(imu.get("angular_velocity"), _AXES3),
+            *_vec(imu.get("linear_acceleration"), _AXES3),
+        )
+    except (TypeError, ValueError, struct.error):
+        return None
+
+
+_F32 = struct.Struct("<f")
+
+
+def _f32(x):
+    """Shortest decimal that maps back to the same float32 (40.1, not 40.099998474121094)."""
+    if x != x:
+        return x
+    # float32 needs at most 9 significant digits to round-trip
+    for digits in range(1, 10):
+        shortest = float(f"{x:.{digits}g}")
+        try:
+            if _F32.unpack(_F32.pack(shortest))[0] == x:
+                return shortest
+        except OverflowError:
+            # rounded past the float32 range
+            continue
+    return x
+
+
+def decode_telemetry(buf):
+    """Inverse of encode_telemetry: returns (telemetry dict, bridge timestamp)."""
+    v = TELEMETRY_STRUCT.unpack_from(buf)
+    _, version, flags, stamp = v[:4]
+    v = v[:4] + tuple(_f32(x) for x in v[4:])
+    if version != TELEMETRY_VERSION:
+        raise ValueError(f"unsupported telemetry layout {version}")
+    imu = None
+    if flags & FLAG_IMU:
+        imu = {
+            "orientation": dict(zip(_AXES4, v[6:10])),
+            "angular_velocity": dict(zip(_AXES3, v[10:13])),
+            "linear_acceleration": dict(zip(_AXES3, v[13:16])),
+        }
+    data = {
+        "ultrasonic_left": v[4] if flags & FLAG_ULTRA_LEFT else None,
+        "ultrasonic_right": v[5] if flags & FLAG_ULTRA_RIGHT else None,
+        "imu": imu,
+    }
+    return data, stamp
+
+
+def encode_client_message(payload):
+    """{"type": "command"|"mode", "data": str} -> bytes."""
+    kind = MSG_COMMAND if payload.get("type") == "command" else MSG_MODE
+    return CLIENT_HEADER.pack(kind) + str(payload.get("data", "")).encode()
+
+
+def decode_client_message(message):
+    """Decode a text (JSON) or binary client frame into {"type", "data"}."""
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        kind = message[0] if len(message) else None
+        if kind not in _CLIENT_KINDS:
+            raise ValueError(f"unknown client message type {kind}")
+        data = bytes(message[CLIENT_HEADER.size:]).decode(errors="ignore")
+        return {"type": _CLIENT_KINDS[kind], "data": data}
+    return json.loads(message)
+
@@ -1,10 +1,14 @@
 # bridge/ros_node.py
 import threading
-import queue
 import rclpy
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from rclpy.executors import MultiThreadedExecutor
 from rclpy.node import Node
 from std_msgs.msg import Char, String, Float32
 from sensor_msgs.msg import Imu
+from .telemetry_state import TelemetryState
+from utils import metrics
+from utils.config import TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES, ROS_EXECUTOR_THREADS
 
 class DobbiRosNode(Node):
     def __init__(self):
@@ -13,46 +17,57 @@ class DobbiRosNode(Node):
         self.cmd_pub = self.create_publisher(Char, '/motor_command', 10)
         self.mode_pub = self.create_publisher(String, '/control_mode', 10)
 
-        # Telemetry subscriptions
-        self.ultra_left = None
-        self.ultra_right = None
-        self.imu_data = None
+        # Telemetry: latest values + recent history in preallocated arrays
+        self.telemetry = TelemetryState(TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES)
+        # Called (without arguments) after every telemetry update
+        self._listeners = []
+        self._callbacks = {
+            topic: metrics.counter("ros_messages_total", "ROS telemetry callbacks by topic", {"topic": topic})
+            for topic in ("ultrasonic_left", "ultrasonic_right", "imu")
+        }
+
+        # One group per topic: a burst of IMU messages can't hold up the
+        # ultrasonic callbacks when run by a multi-threaded executor
+        self.create_subscription(Float32, '/ultrasonic_left', self._ultra_left_cb, 10,
+                                 callback_group=MutuallyExclusiveCallbackGroup())
+        self.create_subscription(Float32, '/ultrasonic_right', self._ultra_right_cb, 10,
+                                 callback_group=MutuallyExclusiveCallbackGroup())
+        self.create_subscription(Imu, '/imu', self._imu_cb, 10,
+                                 callback_group=MutuallyExclusiveCallbackGroup())
+
+    def add_listener(self, fn):
+        """
+        fn() runs on the executor thread right after each update; asyncio
+        consumers should hop onto their loop with call_soon_threadsafe.
+        """
+        self._listeners.append(fn)
 
-        self._lock = threading.Lock()
+    def _count(self, topic):
+        self._callbacks[topic].inc()
 
-        self.create_subscription(Float32, '/ultrasonic_left', self._ultra_left_cb, 10)
-        self.create_subscription(Float32, '/ultrasonic_right', self._ultra_right_cb, 10)
-        self.create_subscription(Imu, '/imu', self._imu_cb, 10)
+    def _notify(self):
+        for fn in self._listeners:
+            try:
+                fn()
+            except Exception as e:
+                print("[DobbiRosNode] listener error:", e)
 
     def _ultra_left_cb(self, msg: Float32):
-        with self._lock:
-            self.ultra_left = float(msg.data)
+        self.telemetry.update("ultrasonic_left", msg.data)
+        self._count("ultrasonic_left")
+        self._notify()
 
     def _ultra_right_cb(self, msg: Float32):
-        with self._lock:
-            self.ultra_right = float(msg.data)
+        self.telemetry.update("ultrasonic_right", msg.data)
+        self._count("ultrasonic_right")
+        self._notify()
 
     def _imu_cb(self, msg: Imu):
-        # convert to a compact dict summary
-        with self._lock:
-            self.imu_data = {
-                "orientation": {
-                    "x": msg.orientation.x,
-                    "y": msg.orientation.y,
-                    "z": msg.orientation.z,
-                    "w": msg.orientation.w
-                },
-                "angular_velocity": {
-                    "x": msg.angular_velocity.x,
-                    "y": msg.angular_velocity.y,
-                    "z": msg.angular_velocity.z
-                },
-                "linear_acceleration": {
-                    "x": msg.linear_acceleration.x,
-                    "y": msg.linear_acceleration.y,
-                    "z": msg.linear_acceleration.z
-                }
-            }
+        # flat row, same order as telemetry_state.IMU_FIELDS
+        o, av, la = msg.orientation, msg.angular_velocity, msg.linear_acceleration
+        self.telemetry.update("imu", (o.x, o.y, o.z, o.w, av.x, av.y, av.z, la.x, la.y, la.z))
+        self._count("imu")
+        self._notify()
 
     def publish_command(self, char_payload: str):
         """
@@ -78,29 +93,38 @@ class DobbiRosNode(Node):
         self.mode_pub.publish(m)
 
     def get_latest_telemetry(self):
-        with self._lock:
-            return {
-                "ultrasonic_left": self.ultra_left,
-                "ultrasonic_right": self.ultra_right,
-                "imu": self.imu_data
-            }
+        return self.telemetry.to_dict()
+
+    def get_history(self, topic, seconds=None, start=None):
+        """(stamps, values) numpy arrays of recent samples for topic."""
+        return self.telemetry.history(topic, seconds, start)
 
 # Helper class to run rclpy in background and expose the node
 class RosNodeHandler:
     def __init__(self):
         rclpy.init(args=None)
-        self.node = DobbiRosNode()
+        try:
+            self.node = DobbiRosNode()
+        except Exception:
+            # Leave rclpy uninitialized so a later retry can init again
+            rclpy.shutdown()
+            raise
+        # The executor blocks on the middleware wait set, so callbacks run as
+        # soon as a message arrives and the thread sleeps while idle
+        self.executor = MultiThreadedExecutor(num_threads=ROS_EXECUTOR_THREADS)
+        self.executor.add_node(self.node)
         self._spin_thread = threading.Thread(target=self._spin, daemon=True)
-        self._running = True
         self._spin_thread.start()
 
     def _spin(self):
         try:
-            while self._running and rclpy.ok():
-                rclpy.spin_once(self.node, timeout_sec=0.01)
+            self.executor.spin()
         except Exception as e:
             print("[RosNodeHandler] spin error:", e)
 
+    def alive(self):
+        return rclpy.ok() and self._spin_thread.is_alive()
+
     def publish_command(self, mapped_char):
         try:
             self.node.publish_command(mapped_char)
@@ -116,10 +140,25 @@ class RosNodeHandler:
     def get_latest_data(self):
         return self.node.get_latest_telemetry()
 
+    def get_history(self, topic, seconds=None, start=None):
+        return self.node.get_history(topic, seconds, start)
+
+    def add_listener(self, fn):
+        self.node.add_listener(fn)
+
+    @property
+    def telemetry(self):
+        return self.node.telemetry
+
     def shutdown(self):
-        self._running = False
-        # Allow spin thread to stop
+        # Wakes the executor so the spin thread can return
+        try:
+            self.executor.shutdown(timeout_sec=1.0)
+            self.node.destroy_node()
+        except Exception as e:
+            print("[RosNodeHandler] shutdown error:", e)
         try:
             rclpy.shutdown()
         except:
             pass
+        self._spin_thread.join(timeout=1.0)
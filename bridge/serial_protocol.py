@@ -0,0 +1,81 @@
+# bridge/serial_protocol.py
+"""
+Parsing of the ESP's serial telemetry lines into the same topics as the
+ROS node (ultrasonic_left / ultrasonic_right / imu, see telemetry_state).
+
+Two line formats are accepted:
+  * JSON, with the get_latest_telemetry() schema; "imu" may be the nested
+    dict or a flat list of 10 floats (orientation xyzw, gyro xyz, accel xyz)
+  * key/value pairs separated by commas or spaces, e.g.
+        UL:23.5,UR:40.1
+        qx=0 qy=0 qz=0 qw=1 gx=0.1 gy=0 gz=0 ax=0 ay=0 az=9.8
+    IMU values are only taken when all ten keys are present.
+"""
+
+import json
+
+from .telemetry_state import IMU_FIELDS, IMU_WIDTH
+
+_ULTRA_KEYS = {
+    "ultrasonic_left": "ultrasonic_left", "ul": "ultrasonic_left", "left": "ultrasonic_left",
+    "ultrasonic_right": "ultrasonic_right", "ur": "ultrasonic_right", "right": "ultrasonic_right",
+}
+IMU_KEYS = ("qx", "qy", "qz", "qw", "gx", "gy", "gz", "ax", "ay", "az")
+
+
+def _imu_values(imu):
+    if isinstance(imu, dict):
+        return [float(imu[name][axis]) for name, axes in IMU_FIELDS for axis in axes]
+    values = [float(v) for v in imu]
+    if len(values) != IMU_WIDTH:
+        raise ValueError(f"imu needs {IMU_WIDTH} values, got {len(values)}")
+    return values
+
+
+def _parse_json(line):
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("telemetry JSON must be an object")
+    samples = []
+    for topic in ("ultrasonic_left", "ultrasonic_right"):
+        if data.get(topic) is not None:
+            samples.append((topic, float(data[topic])))
+    if data.get("imu") is not None:
+        samples.append(("imu", _imu_values(data["imu"])))
+    return samples
+
+
+def _parse_pairs(line):
+    fields = {}
+    for token in line.replace(",", " ").split():
+        sep = ":" if ":" in token else "="
+        key, found, value = token.partition(sep)
+        if not found:
+            raise ValueError(f"expected key:value, got {token!r}")
+        fields[key.strip().lower()] = float(value)
+    samples = []
+    for key, value in fields.items():
+        topic = _ULTRA_KEYS.get(key)
+        if topic:
+            samples.append((topic, value))
+    if all(k in fields for k in IMU_KEYS):
+        samples.append(("imu", [fields[k] for k in IMU_KEYS]))
+    return samples
+
+
+def parse_line(line):
+    """
+    Parse one decoded line into [(topic, values), ...].
+    Returns [] for blank lines; raises ValueError for anything unparseable
+    or a line that carries no known telemetry.
+    """
+    line = line.strip()
+    if not line:
+        return []
+    try:
+        samples = _parse_json(line) if line.startswith("{") else _parse_pairs(line)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"bad telemetry line: {e}") from None
+    if not samples:
+        raise ValueError("no telemetry fields in line")
+    return samples
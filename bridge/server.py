@@ -1,11 +1,30 @@
 # bridge/server.py
 import asyncio
-import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import time
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 import uvicorn
 from .comm_handler import CommHandler
-from utils.config import BRIDGE_HOST, BRIDGE_PORT, WS_PING_INTERVAL
+from .command_dispatch import CommandDispatcher
+from .downsample import METHODS as DOWNSAMPLE_METHODS
+from .protocol import BINARY_SUBPROTOCOL, negotiate, decode_client_message
+from .telemetry import TelemetryBroadcaster, FORMAT_BINARY, FORMAT_JSON
+from .telemetry_state import TOPICS, IMU_FIELDS
+from .video import VideoBroadcaster, MJPEG_BOUNDARY
+from camera.camera_handler import (
+    start_camera, stop_camera, camera_running, wait_for_frame, get_latest_detections, get_camera,
+    list_cameras, cameras,
+)
+from recording.recorder import Recorder
+from detection.alert_logger import log_detection, get_recent_alerts, clear_alerts
+from detection.alert_store import close_store
+from utils import metrics
+from utils.config import (
+    BRIDGE_HOST, BRIDGE_PORT, WS_PING_INTERVAL, TELEMETRY_MAX_RATE, TELEMETRY_CLIENT_QUEUE,
+    TELEMETRY_PUSH_POLL_INTERVAL,
+    VIDEO_JPEG_QUALITY, VIDEO_STREAM_FPS, BRIDGE_CAMERA_AUTOSTART, HISTORY_MAX_POINTS,
+)
 
 app = FastAPI()
 app.add_middleware(
@@ -15,49 +34,320 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-comm = CommHandler()
+# Built by init() on startup, not at import: spawned inference workers
+# re-import the main module (python -m bridge.server) and must not open the
+# serial port or start a ROS node a second time
+comm = None
+dispatcher = None
+telemetry = None
+
+def init(comm_handler=None):
+    """Create the hardware link and its dispatcher/broadcaster (comm_handler: use this one instead)."""
+    global comm, dispatcher, telemetry
+    comm = comm_handler or CommHandler()
+    # Hardware writes happen on the dispatcher's thread, never on the event loop
+    dispatcher = CommandDispatcher(comm)
+    # One producer serializes telemetry once and fans it out to every /ws client
+    telemetry = TelemetryBroadcaster(
+        comm.get_latest_data, poll_interval=WS_PING_INTERVAL,
+        max_rate=TELEMETRY_MAX_RATE, queue_size=TELEMETRY_CLIENT_QUEUE)
+
+def _camera_feeds(name):
+    """(annotated, raw) broadcasters of one camera; raw is for clients drawing their own overlay from /detections."""
+    annotated = VideoBroadcaster(
+        lambda last_id, timeout: wait_for_frame(last_id, timeout, camera=name),
+        quality=VIDEO_JPEG_QUALITY, max_fps=VIDEO_STREAM_FPS)
+    raw = VideoBroadcaster(
+        lambda last_id, timeout: wait_for_frame(last_id, timeout, annotated=False, camera=name),
+        quality=VIDEO_JPEG_QUALITY, max_fps=VIDEO_STREAM_FPS)
+    for stream, broadcaster in (("annotated", annotated), ("raw", raw)):
+        labels = {"stream": stream, "camera": name}
+        metrics.gauge("bridge_video_viewers", "Connected video viewers", labels,
+                      fn=lambda s=broadcaster: s.viewers)
+        metrics.counter("bridge_video_frames_encoded_total", "JPEG encodes (once per frame id)",
+                        labels, fn=lambda s=broadcaster: s.encoded)
+        metrics.counter("bridge_video_frames_dropped_total", "Frames skipped for slow viewers",
+                        labels, fn=lambda s=broadcaster: s.dropped)
+    return annotated, raw
+
+# One encode-once fan-out per camera and stream
+feeds = {name: _camera_feeds(name) for name in cameras}
+
+def _camera_or_404(camera):
+    try:
+        return get_camera(camera)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def _feed(camera, raw):
+    name = _camera_or_404(camera).name
+    if name not in feeds:
+        # Registered after startup
+        feeds[name] = _camera_feeds(name)
+    return name, feeds[name][1 if raw else 0]
+
+@app.on_event("startup")
+async def startup():
+    if comm is None:
+        init()
+    dispatcher.start()
+    telemetry.start()
+    if comm.add_telemetry_listener(telemetry.notify):
+        # Updates are event-driven; the poll only catches a silent transport
+        telemetry.poll_interval = TELEMETRY_PUSH_POLL_INTERVAL
+    else:
+        print("[bridge] transport has no push updates, polling telemetry every", WS_PING_INTERVAL, "s")
+    if BRIDGE_CAMERA_AUTOSTART:
+        start_camera(log_detection)
+
+@app.on_event("shutdown")
+async def shutdown():
+    if recorder is not None:
+        recorder.stop()
+    global comm
+    await telemetry.stop()
+    dispatcher.stop()
+    comm.close()
+    comm = None
+    # No new detections, then write out the alerts still queued
+    stop_camera()
+    close_store()
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "links": comm.link_state()}
 
-@app.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
+# Active run recorder, if any
+recorder = None
+
+@app.post("/recording/start")
+async def recording_start(name: str = None, telemetry_only: bool = False):
+    """Record a run; frames come from this process' camera, so it must be running (or telemetry_only)."""
+    global recorder
+    if recorder is not None and recorder.recording:
+        raise HTTPException(status_code=409, detail=f"already recording {recorder.name}")
+    if not telemetry_only and not camera_running():
+        raise HTTPException(status_code=409, detail="camera not running in the bridge: POST /camera/start "
+                                                    "first, or pass telemetry_only=true")
+    frames = {} if telemetry_only else {"wait_for_frame": wait_for_frame, "get_detections": get_latest_detections}
+    try:
+        rec = Recorder(name, comm=comm, **frames)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        rec.start()
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail=f"recording {rec.name} already exists")
+    recorder = rec
+    return rec.stats()
+
+@app.post("/recording/stop")
+async def recording_stop():
+    if recorder is None or not recorder.recording:
+        raise HTTPException(status_code=409, detail="not recording")
+    # Joining the writer may take a moment while the queue drains
+    await asyncio.get_running_loop().run_in_executor(None, recorder.stop)
+    return recorder.stats()
+
+@app.get("/recording")
+async def recording_status():
+    return recorder.stats() if recorder else {"recording": False}
+
+@app.get("/metrics")
+async def metrics_endpoint(format: str = "prometheus"):
+    """Prometheus text exposition; ?format=json gives a compact snapshot for dashboards."""
+    if format == "json":
+        return metrics.REGISTRY.snapshot()
+    return Response(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# Plain def: start_camera() may wait for a stopping run, keep that off the event loop
+@app.post("/camera/start")
+def camera_start():
+    if not start_camera(log_detection):
+        raise HTTPException(status_code=409, detail="previous camera run is still stopping")
+    return {"status": "started"}
+
+@app.post("/camera/stop")
+def camera_stop():
+    stop_camera()
+    return {"status": "stopped"}
+
+@app.get("/alerts")
+async def alerts(n: int = 10):
+    """Most recent alerts, newest first (detections are logged where the camera runs)."""
+    return get_recent_alerts(n)
+
+@app.post("/alerts/clear")
+async def alerts_clear():
+    clear_alerts()
+    return {"status": "cleared"}
+
+@app.get("/cameras")
+async def cameras_endpoint():
+    """Registered cameras; pass ?camera=<name> to the video and detection endpoints."""
+    return list_cameras()
+
+@app.get("/video.mjpg")
+async def video_mjpeg(raw: bool = False, camera: str = None):
+    """multipart/x-mixed-replace stream; works directly in an <img> tag."""
+    _, source = _feed(camera, raw)
+    q = source.subscribe()
+
+    async def parts():
+        try:
+            while True:
+                _, header, jpeg = await q.get()
+                yield header
+                yield jpeg
+                yield b"\r\n"
+        finally:
+            source.unsubscribe(q)
+
+    return StreamingResponse(
+        parts(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}")
+
+# Plain def: drawing the overlay and JPEG-encoding run in the threadpool,
+# not on the event loop that serves /ws and /ws/video
+@app.get("/video/frame.jpg")
+def video_frame(raw: bool = False, camera: str = None):
+    name, source = _feed(camera, raw)
+    frame_id, frame = wait_for_frame(None, timeout=0, annotated=not raw, camera=name)
+    jpeg = source.snapshot(frame_id, frame)
+    if jpeg is None:
+        return Response(status_code=204)
+    return Response(content=jpeg, media_type="image/jpeg")
+
+def _history_channels():
+    """channel name -> (topic, column): "ultrasonic_left", "imu.orientation.x", ..."""
+    channels = {}
+    for topic, width in TOPICS.items():
+        if topic != "imu":
+            channels[topic] = (topic, 0)
+    col = 0
+    for name, axes in IMU_FIELDS:
+        for axis in axes:
+            channels[f"imu.{name}.{axis}"] = ("imu", col)
+            col += 1
+    return channels
+
+HISTORY_CHANNELS = _history_channels()
+
+@app.get("/telemetry/history")
+async def telemetry_history(
+    channel: str,
+    start: float = Query(-60.0, alias="from"),
+    points: int = 300,
+    method: str = "minmax",
+):
+    """
+    Downsampled series for one telemetry channel.
+    from: epoch seconds, or negative = seconds before now. points: max output size.
+    """
+    if channel not in HISTORY_CHANNELS:
+        raise HTTPException(404, f"unknown channel; one of {sorted(HISTORY_CHANNELS)}")
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(400, f"method must be one of {sorted(DOWNSAMPLE_METHODS)}")
+    topic, col = HISTORY_CHANNELS[channel]
+    if start < 0:
+        start = time.time() + start
+    history = comm.get_history(topic, start=start)
+    if history is None:
+        return {"channel": channel, "method": method, "source_points": 0, "t": [], "v": []}
+    stamps, values = history
+    points = max(2, min(points, HISTORY_MAX_POINTS))
+    # Downsampling is pure numpy but can take a few ms on long windows
+    t, v = await asyncio.get_running_loop().run_in_executor(
+        None, DOWNSAMPLE_METHODS[method], stamps, values[:, col], points)
+    return {
+        "channel": channel,
+        "method": method,
+        "source_points": int(len(stamps)),
+        "t": t.round(3).tolist(),
+        "v": v.round(4).tolist(),
+    }
+
+@app.get("/detections")
+async def detections(camera: str = None):
+    """Structured detections for a camera's latest frame (matches /video.mjpg?raw=1 frame ids)."""
+    cam = _camera_or_404(camera)
+    frame_id, dets = get_latest_detections(cam.name)
+    if dets is None:
+        return {"camera": cam.name, "location": cam.location, "frame_id": None, "detections": None}
+    return {"camera": cam.name, "location": cam.location, "frame_id": frame_id,
+            "detections": dets.to_dict()}
+
+@app.websocket("/ws/video")
+async def video_websocket(ws: WebSocket, raw: bool = False, camera: str = None):
+    """Binary WebSocket alternative to /video.mjpg: one JPEG per message."""
+    if camera is not None and camera not in cameras:
+        await ws.close(code=1008)
+        return
     await ws.accept()
+    _, source = _feed(camera, raw)
+    q = source.subscribe()
     try:
         while True:
-            # handle incoming messages non-blocking
-            try:
-                data = await asyncio.wait_for(ws.receive_text(), timeout=WS_PING_INTERVAL)
-                payload = json.loads(data)
-                # expected payloads:
-                # { "type": "command", "data": "forward" }
-                # { "type": "mode", "data": "auto" }
-                if payload.get("type") == "command":
-                    cmd = payload.get("data")
-                    comm.publish_command(cmd)
-                elif payload.get("type") == "mode":
-                    mode = payload.get("data")
-                    comm.publish_mode(mode)
-            except asyncio.TimeoutError:
-                # no incoming message, proceed to send telemetry
-                pass
-            except WebSocketDisconnect:
-                break
-            except Exception as e:
-                # ignore bad messages and continue
-                print("[bridge] recv error:", e)
-
-            # Send latest telemetry back
-            telemetry = comm.get_latest_data()
-            message = {"type": "telemetry", "data": telemetry}
-            try:
-                await ws.send_text(json.dumps(message, default=str))
-            except Exception:
-                # connection might be closed; break out
-                break
+            _, _, jpeg = await q.get()
+            await ws.send_bytes(jpeg)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        source.unsubscribe(q)
+        try:
+            await ws.close()
+        except:
+            pass
 
+async def _receive_commands(ws: WebSocket):
+    while True:
+        message = await ws.receive()
+        received = time.monotonic()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        try:
+            payload = decode_client_message(message.get("bytes") or message.get("text") or "")
+            # expected payloads:
+            # { "type": "command", "data": "forward" }
+            # { "type": "mode", "data": "auto" }
+            if payload.get("type") == "command":
+                cmd = payload.get("data")
+                dispatcher.submit_command(cmd, received)
+            elif payload.get("type") == "mode":
+                mode = payload.get("data")
+                dispatcher.submit_mode(mode, received)
+        except Exception as e:
+            # ignore bad messages and continue
+            print("[bridge] recv error:", e)
+
+async def _send_telemetry(ws: WebSocket, q):
+    while True:
+        message = await q.get()
+        if isinstance(message, bytes):
+            await ws.send_bytes(message)
+        else:
+            await ws.send_text(message)
+
+@app.websocket("/ws")
+async def websocket_endpoint(ws: WebSocket):
+    # Wire format is negotiated via the WebSocket subprotocol; no offer = JSON
+    subprotocol = negotiate(ws.scope.get("subprotocols") or [])
+    await ws.accept(subprotocol=subprotocol)
+    q = telemetry.subscribe(FORMAT_BINARY if subprotocol == BINARY_SUBPROTOCOL else FORMAT_JSON)
+    tasks = [
+        asyncio.create_task(_receive_commands(ws)),
+        asyncio.create_task(_send_telemetry(ws, q)),
+    ]
+    try:
+        # Either side ending (disconnect, send failure) closes the connection
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, WebSocketDisconnect):
+                print("[bridge] ws error:", exc)
     finally:
+        telemetry.unsubscribe(q)
+        for task in tasks:
+            task.cancel()
         try:
             await ws.close()
         except:
@@ -0,0 +1,133 @@
+# bridge/telemetry.py
+"""
+Single-producer telemetry fan-out.
+One task snapshots telemetry when the transport reports new data, serializes
+it once per wire format in use and pushes the same message to every client
+through a small bounded queue; when a client falls behind its oldest message
+is dropped.
+"""
+
+import asyncio
+import time
+
+from utils import metrics
+from .protocol import encode_json, encode_telemetry
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary"
+
+
+class TelemetryBroadcaster:
+    def __init__(self, snapshot, poll_interval=0.5, max_rate=20.0, queue_size=4):
+        # snapshot() -> current telemetry (any JSON-serializable value)
+        self._snapshot = snapshot
+        # Safety-net poll; with push notifications this can be long
+        self.poll_interval = poll_interval
+        self._min_gap = 1.0 / max_rate if max_rate and max_rate > 0 else 0.0
+        self._queue_size = queue_size
+        self._subscribers = {}   # queue -> wire format
+        self._changed = None
+        self._loop = None
+        self._task = None
+        self._last_data = None
+        self._last_messages = {}  # wire format -> latest encoded message
+        self.sent = 0
+        self.dropped = 0
+        self._sent_metric = metrics.counter("bridge_ws_messages_total", "Telemetry messages queued to /ws clients")
+        self._dropped_metric = metrics.counter("bridge_ws_dropped_total",
+                                               "Telemetry messages dropped for slow /ws clients")
+        self._snapshots = metrics.counter("bridge_telemetry_snapshots_total", "Telemetry snapshots taken")
+        metrics.gauge("bridge_ws_clients", "Connected /ws telemetry clients", fn=lambda: self.clients)
+
+    @property
+    def clients(self):
+        return len(self._subscribers)
+
+    def start(self):
+        """Start the producer task; call from the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def notify(self):
+        """New data is available; safe to call from any thread."""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._changed.set)
+        except RuntimeError:
+            # loop already closed
+            pass
+
+    def serialize(self, data, fmt):
+        """Encode once for fmt; binary falls back to JSON for data the struct layout can't hold."""
+        if fmt == FORMAT_BINARY:
+            packed = encode_telemetry(data)
+            if packed is not None:
+                return packed
+        return encode_json(data)
+
+    async def _run(self):
+        last_push = 0.0
+        while True:
+            try:
+                # Without push notifications this degrades to polling every poll_interval
+                await asyncio.wait_for(self._changed.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            # Coalesce bursts (e.g. 200 Hz IMU) into at most max_rate messages/s
+            gap = self._min_gap - (time.monotonic() - last_push)
+            if gap > 0:
+                await asyncio.sleep(gap)
+            self._changed.clear()
+
+            self._snapshots.inc()
+            try:
+                data = self._snapshot()
+            except Exception as e:
+                print("[bridge] telemetry snapshot error:", e)
+                continue
+            if data == self._last_data and self._last_messages:
+                continue
+            self._last_data = data
+            # Only encode the formats somebody is actually subscribed with
+            formats = set(self._subscribers.values()) or {FORMAT_JSON}
+            self._last_messages = {fmt: self.serialize(data, fmt) for fmt in formats}
+            last_push = time.monotonic()
+            self._fan_out(self._last_messages)
+
+    def _fan_out(self, messages):
+        for q, fmt in self._subscribers.items():
+            if q.full():
+                q.get_nowait()
+                self.dropped += 1
+                self._dropped_metric.inc()
+            q.put_nowait(messages[fmt])
+            self.sent += 1
+        self._sent_metric.inc(len(self._subscribers))
+
+    def subscribe(self, fmt=FORMAT_JSON):
+        """Register a client; it immediately receives the latest message, if any."""
+        q = asyncio.Queue(maxsize=self._queue_size)
+        if self._last_data is not None or self._last_messages:
+            message = self._last_messages.get(fmt)
+            if message is None:
+                message = self._last_messages[fmt] = self.serialize(self._last_data, fmt)
+            q.put_nowait(message)
+        self._subscribers[q] = fmt
+        return q
+
+    def unsubscribe(self, q):
+        self._subscribers.pop(q, None)
+
+    def stats(self):
+        return {"clients": self.clients, "sent": self.sent, "dropped": self.dropped}
@@ -0,0 +1,123 @@
+# bridge/telemetry_state.py
+"""
+Preallocated telemetry storage shared by the transports.
+Callbacks write straight into fixed numpy arrays (no per-message dicts); the
+nested telemetry dict is only built when a consumer asks for it. Every topic
+also keeps a fixed-size ring of recent samples with receive timestamps.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+IMU_FIELDS = (
+    ("orientation", ("x", "y", "z", "w")),
+    ("angular_velocity", ("x", "y", "z")),
+    ("linear_acceleration", ("x", "y", "z")),
+)
+IMU_WIDTH = sum(len(axes) for _, axes in IMU_FIELDS)
+
+# topic -> number of values per sample
+TOPICS = {
+    "ultrasonic_left": 1,
+    "ultrasonic_right": 1,
+    "imu": IMU_WIDTH,
+}
+
+
+class TopicRing:
+    """Fixed-capacity ring of (timestamp, values) samples for one topic."""
+
+    def __init__(self, capacity, width):
+        self.capacity = max(1, int(capacity))
+        self.width = width
+        self.stamps = np.zeros(self.capacity, dtype=np.float64)
+        self.values = np.zeros((self.capacity, width), dtype=np.float64)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, stamp, values):
+        i = self._head
+        self.stamps[i] = stamp
+        self.values[i] = values
+        self._head = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def latest(self):
+        if not self._size:
+            return None, None
+        i = (self._head - 1) % self.capacity
+        return self.stamps[i], self.values[i]
+
+    def since(self, start=None):
+        """Copies of (stamps, values), oldest first, with stamp >= start."""
+        if self._size < self.capacity:
+            stamps = self.stamps[:self._size].copy()
+            values = self.values[:self._size].copy()
+        else:
+            order = np.r_[self._head:self.capacity, 0:self._head]
+            stamps = self.stamps[order]
+            values = self.values[order]
+        if start is not None:
+            first = np.searchsorted(stamps, start, side="left")
+            stamps, values = stamps[first:], values[first:]
+        return stamps, values
+
+
+class TelemetryState:
+    def __init__(self, history_seconds=60.0, rates=None):
+        # rates: topic -> expected max Hz, sizes each topic's history ring
+        rates = rates or {}
+        self._lock = threading.Lock()
+        self.rings = {
+            topic: TopicRing(history_seconds * rates.get(topic, 50), width)
+            for topic, width in TOPICS.items()
+        }
+        # sink(topic, stamp, values) sees every sample (e.g. the run recorder)
+        self.sinks = []
+
+    def update(self, topic, values, stamp=None):
+        """Record one sample; values is a scalar or a sequence of TOPICS[topic] floats."""
+        stamp = time.time() if stamp is None else stamp
+        with self._lock:
+            self.rings[topic].append(stamp, values)
+        for sink in self.sinks:
+            sink(topic, stamp, values)
+
+    def latest(self, topic):
+        with self._lock:
+            stamp, values = self.rings[topic].latest()
+            return stamp, None if values is None else values.copy()
+
+    def history(self, topic, seconds=None, start=None):
+        """(stamps, values) for topic over the last `seconds` (or since `start`)."""
+        if seconds is not None:
+            start = time.time() - seconds
+        with self._lock:
+            return self.rings[topic].since(start)
+
+    def to_dict(self):
+        """The classic telemetry dict (ultrasonic_left/right + nested imu)."""
+        with self._lock:
+            _, ul = self.rings["ultrasonic_left"].latest()
+            _, ur = self.rings["ultrasonic_right"].latest()
+            _, imu = self.rings["imu"].latest()
+            ul = None if ul is None else float(ul[0])
+            ur = None if ur is None else float(ur[0])
+            imu = None if imu is None else imu.tolist()
+        imu_dict = None
+        if imu is not None:
+            imu_dict, i = {}, 0
+            for name, axes in IMU_FIELDS:
+                imu_dict[name] = dict(zip(axes, imu[i:i + len(axes)]))
+                i += len(axes)
+        return {
+            "ultrasonic_left": ul,
+            "ultrasonic_right": ur,
+            "imu": imu_dict,
+        }
@@ -0,0 +1,200 @@
+# bridge/transport.py
+"""
+Supervision of one hardware link (serial port or ROS node).
+A background thread (re)connects with exponential backoff and checks the
+link's health. While the link is down only the latest mode and the latest
+drive command are kept; they are replayed, mode first, as soon as the link
+comes back. A buffered stop is always replayed, other commands only while
+they are fresh.
+"""
+
+import random
+import threading
+import time
+
+STATE_DOWN = "down"
+STATE_CONNECTING = "connecting"
+STATE_UP = "up"
+
+
+class TransportSupervisor:
+    def __init__(self, name, connect, is_alive, disconnect=None, on_connect=None,
+                 backoff_initial=0.5, backoff_max=10.0, check_interval=0.5,
+                 command_max_age=2.0, stop_value=None):
+        # connect() -> link (raises on failure); is_alive(link) -> bool
+        # disconnect(link) cleans up a dead link; on_connect(link) runs after
+        # every successful (re)connect, before buffered commands are replayed;
+        # stop_value is the command payload that is never dropped as stale
+        self.name = name
+        self._connect = connect
+        self._is_alive = is_alive
+        self._disconnect = disconnect
+        self._on_connect = on_connect
+        self._backoff_initial = backoff_initial
+        self._backoff_max = backoff_max
+        self._check_interval = check_interval
+        self._command_max_age = command_max_age
+        self._stop_value = stop_value
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.link = None
+        self.state = STATE_DOWN
+        self.connects = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.last_error = None
+        self.down_since = time.time()
+        self.retry_in = 0.0
+        # Latest mode / drive command sent while the link was down
+        self._pending_mode = None
+        self._pending_command = None    # (value, monotonic time)
+
+    @property
+    def connected(self):
+        return self.state == STATE_UP
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        with self._lock:
+            link, self.link = self.link, None
+            self.state = STATE_DOWN
+        if link is not None and self._disconnect:
+            self._safe_disconnect(link)
+
+    def wake(self):
+        """Ask the supervisor to re-check the link now (e.g. after a failed write)."""
+        self._wake.set()
+
+    # --- sending -----------------------------------------------------------
+
+    def send(self, kind, value, fn):
+        """
+        Send through fn(link, value) if the link is up, otherwise buffer it
+        (kind "mode" or "command"; only the latest of each is kept).
+        fn returns False or raises to report a failed write.
+        Returns True if the value went out.
+        """
+        with self._lock:
+            link = self.link
+            if link is not None:
+                try:
+                    if fn(link, value) is not False:
+                        return True
+                except Exception as e:
+                    print(f"[{self.name}] send failed:", e)
+                # The link looks dead; buffer and let the supervisor check it
+                self._wake.set()
+            if kind == "mode":
+                self._pending_mode = (value, fn)
+            else:
+                self._pending_command = (value, fn, time.monotonic())
+            return False
+
+    def _replay(self, link):
+        mode, self._pending_mode = self._pending_mode, None
+        command, self._pending_command = self._pending_command, None
+        if mode is not None:
+            value, fn = mode
+            self._try(fn, link, value)
+        if command is not None:
+            value, fn, queued = command
+            # A stale drive command is not worth replaying on a moving robot,
+            # but the robot may still be running the last one: stop always goes out
+            if value == self._stop_value or time.monotonic() - queued <= self._command_max_age:
+                self._try(fn, link, value)
+            else:
+                print(f"[{self.name}] dropped stale buffered command:", value)
+
+    def _try(self, fn, link, value):
+        try:
+            fn(link, value)
+        except Exception as e:
+            print(f"[{self.name}] replay failed:", e)
+
+    # --- supervisor thread ------------------------------------------------
+
+    def _safe_disconnect(self, link):
+        try:
+            self._disconnect(link)
+        except Exception as e:
+            print(f"[{self.name}] disconnect error:", e)
+
+    def _alive(self, link):
+        try:
+            return bool(self._is_alive(link))
+        except Exception:
+            return False
+
+    def _wait(self, seconds):
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def _run(self):
+        delay = self._backoff_initial
+        while not self._stopped.is_set():
+            link = self.link
+            if link is not None:
+                if self._alive(link):
+                    self._wait(self._check_interval)
+                    continue
+                print(f"[{self.name}] link lost, reconnecting")
+                with self._lock:
+                    self.link = None
+                    self.state = STATE_DOWN
+                    self.down_since = time.time()
+                if self._disconnect:
+                    self._safe_disconnect(link)
+
+            self.state = STATE_CONNECTING
+            try:
+                link = self._connect()
+                if not self._alive(link):
+                    raise RuntimeError("link not usable after connect")
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                self.state = STATE_DOWN
+                # Jitter keeps several links from retrying in lockstep
+                self.retry_in = delay * random.uniform(0.8, 1.2)
+                self._stopped.wait(self.retry_in)
+                delay = min(delay * 2, self._backoff_max)
+                continue
+
+            if self._on_connect:
+                try:
+                    self._on_connect(link)
+                except Exception as e:
+                    print(f"[{self.name}] on_connect error:", e)
+            with self._lock:
+                self._replay(link)
+                self.link = link
+                self.state = STATE_UP
+                self.connects += 1
+                if self.connects > 1:
+                    self.reconnects += 1
+            delay = self._backoff_initial
+            self.retry_in = 0.0
+            print(f"[{self.name}] link up (reconnects: {self.reconnects})")
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "down_since": None if self.connected else self.down_since,
+            "retry_in": self.retry_in,
+            "buffered_mode": self._pending_mode is not None,
+            "buffered_command": self._pending_command is not None,
+        }
@@ -0,0 +1,120 @@
+# bridge/video.py
+"""
+Encode-once video fan-out.
+A single producer thread waits for new annotated frames, JPEG-encodes each
+frame id exactly once and hands the same bytes to every viewer. Viewers get a
+one-slot queue: a slow consumer just skips to the newest frame.
+"""
+
+import asyncio
+import threading
+import time
+
+import cv2
+
+MJPEG_BOUNDARY = "frame"
+
+
+class VideoBroadcaster:
+    def __init__(self, wait_for_frame, quality=80, max_fps=15):
+        # wait_for_frame(last_id, timeout) -> (frame_id, frame or None)
+        self._wait_for_frame = wait_for_frame
+        self._quality = int(quality)
+        self._period = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self._subscribers = set()
+        self._loop = None
+        self._thread = None
+        self._running = threading.Event()
+        self._state_lock = threading.Lock()
+        self._latest = None      # (frame_id, part_header, jpeg)
+        self._latest_lock = threading.Lock()
+        self.encoded = 0
+        self.dropped = 0
+
+    @property
+    def viewers(self):
+        return len(self._subscribers)
+
+    def _encode(self, frame_id, frame):
+        with self._latest_lock:
+            if self._latest is not None and self._latest[0] == frame_id:
+                return self._latest
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self._quality])
+        if not ok:
+            return None
+        jpeg = buf.tobytes()
+        header = (
+            f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+            f"Content-Length: {len(jpeg)}\r\n\r\n"
+        ).encode()
+        entry = (frame_id, header, jpeg)
+        with self._latest_lock:
+            self._latest = entry
+            self.encoded += 1
+        return entry
+
+    def _run(self):
+        last_id = None
+        while True:
+            with self._state_lock:
+                if not self._running.is_set():
+                    self._thread = None
+                    return
+            t0 = time.monotonic()
+            frame_id, frame = self._wait_for_frame(last_id, 0.5)
+            if frame is None:
+                continue
+            last_id = frame_id
+            entry = self._encode(frame_id, frame)
+            if entry is not None:
+                try:
+                    self._loop.call_soon_threadsafe(self._fan_out, entry)
+                except RuntimeError:
+                    # event loop closed
+                    self._running.clear()
+            if self._period:
+                delay = self._period - (time.monotonic() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _fan_out(self, entry):
+        # Runs on the event loop thread
+        for q in list(self._subscribers):
+            if q.full():
+                try:
+                    q.get_nowait()
+                    self.dropped += 1
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait(entry)
+
+    def subscribe(self):
+        """Register a viewer; must be called from the event loop. Returns its queue."""
+        self._loop = asyncio.get_running_loop()
+        q = asyncio.Queue(maxsize=1)
+        self._subscribers.add(q)
+        with self._latest_lock:
+            if self._latest is not None:
+                q.put_nowait(self._latest)
+        with self._state_lock:
+            self._running.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        self._subscribers.discard(q)
+        if not self._subscribers:
+            # No viewers: stop encoding altogether
+            self._running.clear()
+
+    def snapshot(self, frame_id, frame):
+        """JPEG bytes for a single frame, reusing the cached encode when possible."""
+        if frame is None:
+            return None
+        entry = self._encode(frame_id, frame)
+        return entry[2] if entry else None
+
+    def stats(self):
+        return {"viewers": self.viewers, "encoded": self.encoded, "dropped": self.dropped}
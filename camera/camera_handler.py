@@ -3,48 +3,494 @@
 import cv2
 import threading
 import time
-from ultralytics import YOLO
-from utils.config import CAMERA_INDEX, MODEL_PATH, CONFIDENCE_THRESHOLD
+from utils.config import (
+    CAMERA_INDEX, CAMERAS, MODEL_PATH, CONFIDENCE_THRESHOLD, CAMERA_TARGET_FPS, CAMERA_STOP_TIMEOUT,
+    DETECTOR_IMGSZ,
+    INFERENCE_ENGINE, INFERENCE_WORKER_SLOTS,
+    MOTION_GATE_ENABLED, MOTION_THRESHOLD, MOTION_PIXEL_DELTA, MOTION_FORCE_INTERVAL,
+    TRACKING_ENABLED, DETECT_EVERY_N_FRAMES, TRACK_MIN_CONFIDENCE, TRACK_IOU_THRESHOLD,
+    PPE_ANALYSIS_ENABLED, PPE_REQUIRED_ITEMS, PPE_CONTAINMENT_THRESHOLD,
+    DETECTOR_BACKEND, GOVERNOR_ENABLED, INFERENCE_LATENCY_BUDGET_MS, CPU_BUDGET,
+    GOVERNOR_IMGSZ_STEPS, GOVERNOR_MAX_DETECT_EVERY, GOVERNOR_FPS_STEPS,
+    GOVERNOR_ADJUST_INTERVAL, GOVERNOR_HEADROOM, GOVERNOR_RECOVER_PERIODS,
+)
+from camera.detections import Detections, draw_detections
+from camera.detector import get_detector
+from camera.frame_mailbox import LatestFrameMailbox, wait_any
+from camera.governor import InferenceGovernor, build_ladder
+from camera.inference_worker import ProcessInferenceEngine
+from camera.motion_gate import MotionGate
+from camera.tracker import IoUTracker
+from detection.ppe_analysis import PPEAnalyzer
+from utils import metrics
 
-model = YOLO(MODEL_PATH)
-latest_frame = None
-camera_event = threading.Event()
-frame_lock = threading.Lock()
+# The current pipeline run: its stop flag and camera_loop thread. Every run
+# gets a fresh Event so a run that is still winding down can neither keep
+# going nor stop its successor (see start_camera)
+_run_lock = threading.Lock()
+_run_event = None
+_run_thread = None
 
-def camera_loop(detection_callback):
-    global latest_frame
-    cap = cv2.VideoCapture(CAMERA_INDEX)
+# Shared by every camera's mailbox so the inference loop can wait on all of them
+_frames_ready = threading.Condition()
 
-    while camera_event.is_set():
+stats_lock = threading.Lock()
+
+def _new_stats():
+    return {
+        "captured": 0,
+        "read_errors": 0,
+        "capture_dropped": 0,   # overwritten in the mailbox before inference took them,
+                                # i.e. every frame the inference stage never saw
+        "inferred": 0,
+        "reused": 0,            # frames served from the previous detections
+        "tracked": 0,           # frames served by the tracker instead of the detector
+        "ppe_violations": 0,    # person detections flagged as missing PPE
+        "rendered": 0,          # overlays actually drawn (on demand)
+        "inference_ms": 0.0,
+        "render_ms": 0.0,
+        "latency_ms": 0.0,      # capture -> detections available
+    }
+
+
+class Camera:
+    """
+    One registered source: its capture -> inference mailbox, motion gate and
+    tracker, and the latest published result (raw frame plus detections). The
+    annotated overlay is only drawn when somebody asks for it, at most once
+    per frame id.
+    """
+
+    def __init__(self, name, source=None, location=None):
+        self.name = name
+        self.source = source
+        self.location = location or name
+        # Capture -> inference hand-off; only the newest frame is ever kept
+        self.mailbox = LatestFrameMailbox(_frames_ready)
+        # Skips YOLO while the scene is static (e.g. parked at an inspection point)
+        self.motion_gate = MotionGate(MOTION_THRESHOLD, MOTION_PIXEL_DELTA, MOTION_FORCE_INTERVAL)
+        # Carries boxes forward between detector runs when TRACKING_ENABLED
+        self.tracker = IoUTracker(iou_threshold=TRACK_IOU_THRESHOLD)
+        self.lock = threading.Lock()
+        # Signalled whenever a new frame is published
+        self.cond = threading.Condition(self.lock)
+        self.raw = None
+        self.detections = None
+        self.frame_id = 0
+        self.annotated = (None, None)  # (frame_id, annotated frame)
+        self.active = False
+        self.stats = _new_stats()      # guarded by stats_lock
+        # Inference loop state
+        self.previous = None           # detections of the last published frame
+        self.since_detect = 0
+
+    def reset(self):
+        self.previous = None
+        self.since_detect = 0
+        self.tracker.reset()
+
+    def info(self):
+        return {"name": self.name, "location": self.location, "active": self.active,
+                "frame_id": self.frame_id}
+
+
+# Camera registry (CAMERAS in utils/config.py); the first one is the default
+cameras = {
+    name: Camera(name, spec.get("source", CAMERA_INDEX), spec.get("location"))
+    for name, spec in CAMERAS.items()
+}
+DEFAULT_CAMERA = next(iter(cameras))
+
+def get_camera(name=None):
+    """Registered camera by name (the default camera for None); KeyError if unknown."""
+    camera = cameras.get(DEFAULT_CAMERA if name is None else name)
+    if camera is None:
+        raise KeyError(f"unknown camera {name!r}, one of {list(cameras)}")
+    return camera
+
+def add_camera(name, source=None, location=None):
+    """Register another camera at runtime (it runs from the next start_camera)."""
+    if name in cameras:
+        raise ValueError(f"camera {name!r} already registered")
+    camera = cameras[name] = Camera(name, source, location)
+    return camera
+
+def list_cameras():
+    return [camera.info() for camera in cameras.values()]
+
+def _governor_ladder():
+    # Exported (onnx/openvino) models have a fixed input size
+    sizes = [DETECTOR_IMGSZ]
+    if DETECTOR_BACKEND == "pytorch":
+        sizes += sorted((s for s in GOVERNOR_IMGSZ_STEPS if s < DETECTOR_IMGSZ), reverse=True)
+    return build_ladder(
+        sizes,
+        detect_every=DETECT_EVERY_N_FRAMES,
+        max_detect_every=GOVERNOR_MAX_DETECT_EVERY if TRACKING_ENABLED else DETECT_EVERY_N_FRAMES,
+        fps_steps=GOVERNOR_FPS_STEPS if CAMERA_TARGET_FPS else (),
+    )
+
+# Trades input size, detector runs and rate for latency when over budget
+governor = InferenceGovernor(
+    _governor_ladder(), INFERENCE_LATENCY_BUDGET_MS, CPU_BUDGET,
+    interval=GOVERNOR_ADJUST_INTERVAL, headroom=GOVERNOR_HEADROOM,
+    recover_periods=GOVERNOR_RECOVER_PERIODS, enabled=GOVERNOR_ENABLED,
+)
+
+# Finds people missing required PPE in each frame's detections
+ppe_analyzer = PPEAnalyzer(PPE_REQUIRED_ITEMS, threshold=PPE_CONTAINMENT_THRESHOLD)
+
+# Prometheus-style metrics (see utils/metrics.py), summed over cameras; the
+# per-camera stats dicts keep the last values for get_camera_stats()
+_STAGE_HELP = "Time spent per camera pipeline stage"
+_stage_capture = metrics.histogram("camera_stage_seconds", _STAGE_HELP, {"stage": "capture"})
+_stage_inference = metrics.histogram("camera_stage_seconds", _STAGE_HELP, {"stage": "inference"})
+_stage_render = metrics.histogram("camera_stage_seconds", _STAGE_HELP, {"stage": "render"})
+_stage_latency = metrics.histogram("camera_stage_seconds", _STAGE_HELP, {"stage": "capture_to_publish"})
+# Frames per detector call = camera_frames_total{outcome="inferred"} / this
+_batches = metrics.counter("camera_inference_batches_total", "Detector calls (one batch of frames each)")
+_FRAMES_HELP = "Camera frames by outcome"
+_frames = {
+    kind: metrics.counter("camera_frames_total", _FRAMES_HELP, {"outcome": kind})
+    for kind in ("captured", "inferred", "reused", "tracked")
+}
+_read_errors = metrics.counter("camera_read_errors_total", "Failed cap.read() calls")
+# A frame overwritten in a mailbox is the only way a capture goes uninferred
+metrics.counter("camera_frames_dropped_total", "Captured frames never inferred",
+                fn=lambda: sum(camera.mailbox.dropped for camera in list(cameras.values())))
+_ppe_violations = metrics.counter("camera_ppe_violations_total", "Person detections missing PPE")
+metrics.gauge("camera_governor_level", "Inference governor ladder position (0 = full quality)",
+              fn=lambda: governor.level)
+metrics.gauge("camera_governor_imgsz", "Detector input size chosen by the governor",
+              fn=lambda: governor.setting.imgsz)
+metrics.gauge("camera_governor_detect_every", "Frames per detector run chosen by the governor",
+              fn=lambda: governor.setting.detect_every)
+for _direction in ("down", "up"):
+    metrics.counter("camera_governor_steps_total", "Inference governor adjustments",
+                    {"direction": _direction}, fn=lambda d=_direction: governor.steps[d])
+
+def _bump(camera, key, n=1):
+    with stats_lock:
+        camera.stats[key] += n
+
+def capture_loop(running, cap, camera=None):
+    """Grab frames as fast as the device delivers them into the camera's mailbox while running is set."""
+    camera = camera or get_camera()
+    while running.is_set():
+        t0 = time.monotonic()
         ret, frame = cap.read()
         if not ret:
+            _bump(camera, "read_errors")
+            _read_errors.inc()
+            time.sleep(0.01)
             continue
+        camera.mailbox.put(frame)
+        _stage_capture.observe(time.monotonic() - t0)
+        _bump(camera, "captured")
+        _frames["captured"].inc()
+    with stats_lock:
+        camera.stats["capture_dropped"] = camera.mailbox.dropped
+
+def _publish(camera, seq, stamp, frame, dets, infer_ms, detection_callback, kind="inferred"):
+    # Send to detection alert logger, tagged with where the camera looks
+    labels = dets.labels()
+    if dets.track_ids is None:
+        for label in labels:
+            detection_callback(label, location=camera.location)
+    else:
+        for label, track_id in zip(labels, dets.track_ids):
+            detection_callback(label, location=camera.location, track_id=int(track_id))
+
+    violations = ppe_analyzer.analyze(dets) if PPE_ANALYSIS_ENABLED else []
+    for det_i, track_id, missing in violations:
+        detection_callback(labels[det_i], location=camera.location, ppe_violation=True,
+                           track_id=track_id, missing_ppe=missing)
 
-        results = model.predict(source=frame, conf=CONFIDENCE_THRESHOLD, verbose=False)
-        annotated = results[0].plot()
-        classes = results[0].boxes.cls.tolist()
-        names = results[0].names
+    with camera.cond:
+        camera.raw = frame
+        camera.detections = dets
+        camera.frame_id = seq
+        camera.cond.notify_all()
 
-        # Send to detection alert logger
-        for cls_id in classes:
-            label = names[int(cls_id)]
-            detection_callback(label)
+    done = time.monotonic()
+    with stats_lock:
+        stats = camera.stats
+        stats[kind] += 1
+        stats["ppe_violations"] += len(violations)
+        stats["capture_dropped"] = camera.mailbox.dropped
+        if kind == "inferred":
+            stats["inference_ms"] = infer_ms
+        stats["latency_ms"] = (done - stamp) * 1000.0
+    _frames[kind].inc()
+    if violations:
+        _ppe_violations.inc(len(violations))
+    if kind == "inferred":
+        _stage_inference.observe(infer_ms / 1000.0)
+    _stage_latency.observe(done - stamp)
 
-        with frame_lock:
-            latest_frame = annotated
+def _pace(period, next_due):
+    """Sleep until the next inference slot; returns the following deadline."""
+    if not period:
+        return next_due
+    next_due += period
+    delay = next_due - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+        return next_due
+    # Behind schedule: don't try to catch up with a burst
+    return time.monotonic()
 
-        time.sleep(0.05)
+def _frame_period():
+    return 1.0 / CAMERA_TARGET_FPS if CAMERA_TARGET_FPS and CAMERA_TARGET_FPS > 0 else 0.0
 
-    cap.release()
+def _scene_unchanged(camera, frame):
+    """Motion gate check; only meaningful once there is something to reuse."""
+    if not MOTION_GATE_ENABLED:
+        return False
+    if camera.previous is None:
+        camera.motion_gate.reset()
+    return not camera.motion_gate.should_infer(frame) and camera.previous is not None
 
-def start_camera(detection_callback):
-    if not camera_event.is_set():
-        camera_event.set()
-        threading.Thread(target=camera_loop, args=(detection_callback,), daemon=True).start()
+def _can_track(camera, detect_every=DETECT_EVERY_N_FRAMES):
+    """True if the tracker may stand in for the detector on this camera's frame."""
+    if not TRACKING_ENABLED or camera.previous is None:
+        return False
+    if camera.since_detect + 1 >= max(detect_every, 1):
+        return False
+    return camera.tracker.confidence() >= TRACK_MIN_CONFIDENCE
+
+def _thread_detect(frames, imgsz=DETECTOR_IMGSZ):
+    """One predict call for the whole batch; returns ([Detections], ms)."""
+    t0 = time.monotonic()
+    results = get_detector().predict(source=frames, conf=CONFIDENCE_THRESHOLD, imgsz=imgsz, verbose=False)
+    dets = [Detections.from_result(result) for result in results]
+    return dets, (time.monotonic() - t0) * 1000.0
+
+def _process_detector(engines, running):
+    # The worker takes one frame at a time; cameras with different
+    # resolutions get a worker each so the shared rings are never rebuilt
+    def detect_one(frame, imgsz):
+        engine = engines.get(frame.shape)
+        if engine is None:
+            engine = engines[frame.shape] = ProcessInferenceEngine(
+                MODEL_PATH, CONFIDENCE_THRESHOLD, slots=INFERENCE_WORKER_SLOTS)
+        engine.submit(frame, 0, 0.0, imgsz)
+        while running.is_set():
+            result = engine.poll(timeout=0.5)
+            if result is not None:
+                _, _, rows, infer_ms = result
+                return Detections.from_array(rows, engine.class_names), infer_ms
+            if not engine.busy:
+                return None
+        return None
+
+    def detect(frames, imgsz=DETECTOR_IMGSZ):
+        dets, total_ms = [], 0.0
+        for frame in frames:
+            out = detect_one(frame, imgsz)
+            if out is None:
+                return None
+            dets.append(out[0])
+            total_ms += out[1]
+        return dets, total_ms
+    return detect
+
+def inference_loop(running, detection_callback, selected=None, detect=_thread_detect):
+    """
+    Produce detections for the freshest capture of every selected camera,
+    paced to CAMERA_TARGET_FPS. Each frame is served by one of: the previous
+    detections (static scene), the camera's tracker (between detector runs)
+    or the detector; frames that need the detector in the same cycle go
+    through one batched call. The governor picks the detector input size,
+    run interval and rate. Runs until the running Event is cleared.
+    """
+    selected = list(cameras.values()) if selected is None else selected
+    mailboxes = [camera.mailbox for camera in selected]
+    next_due = time.monotonic()
+    for camera in selected:
+        camera.reset()
+    governor.reset()
+
+    while running.is_set():
+        if not wait_any(mailboxes, timeout=0.5):
+            continue
+        setting = governor.setting
+        batch = []
+        for camera in selected:
+            seq, stamp, frame = camera.mailbox.take(timeout=0)
+            if frame is None:
+                continue
+            if _scene_unchanged(camera, frame):
+                _publish(camera, seq, stamp, frame, camera.previous, 0.0, detection_callback,
+                         kind="reused")
+            elif _can_track(camera, setting.detect_every):
+                dets = camera.tracker.predict()
+                camera.since_detect += 1
+                camera.previous = dets
+                _publish(camera, seq, stamp, frame, dets, 0.0, detection_callback, kind="tracked")
+            else:
+                batch.append((camera, seq, stamp, frame))
+
+        if batch:
+            out = detect([item[3] for item in batch], imgsz=setting.imgsz)
+            if out is None:
+                continue
+            results, infer_ms = out
+            governor.observe(infer_ms)
+            _batches.inc()
+            for (camera, seq, stamp, frame), dets in zip(batch, results):
+                if TRACKING_ENABLED:
+                    dets = camera.tracker.update(dets)
+                camera.since_detect = 0
+                camera.previous = dets
+                _publish(camera, seq, stamp, frame, dets, infer_ms, detection_callback)
+
+        next_due = _pace(_frame_period() / setting.fps_scale, next_due)
+
+def process_inference_loop(running, detection_callback, selected=None):
+    """Same contract as inference_loop, but YOLO runs in separate worker processes."""
+    engines = {}
+    try:
+        inference_loop(running, detection_callback, selected, detect=_process_detector(engines, running))
+    finally:
+        for engine in engines.values():
+            engine.stop()
+
+def _open_source(source):
+    """source: None (CAMERA_INDEX), a device index / file path / URL, or a capture-like object."""
+    if hasattr(source, "read"):
+        return source
+    cap = cv2.VideoCapture(CAMERA_INDEX if source is None else source)
+    # Keep the driver queue as short as possible so reads return fresh frames
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def _select(source):
+    """
+    (camera, source) pairs to run. source: None for every registered camera,
+    a {name: source} dict, or a single source for the default camera only.
+    """
+    if source is None:
+        return [(camera, camera.source) for camera in cameras.values()]
+    if isinstance(source, dict):
+        return [(get_camera(name), src) for name, src in source.items()]
+    return [(get_camera(), source)]
+
+def camera_loop(running, detection_callback, source=None):
+    selected, caps, capture_threads = [], [], []
+    try:
+        for camera, src in _select(source):
+            cap = _open_source(src)
+            camera.active = True
+            selected.append(camera)
+            caps.append(cap)
+            capture_threads.append(threading.Thread(target=capture_loop, args=(running, cap, camera),
+                                                   daemon=True))
+        for t in capture_threads:
+            t.start()
+        if INFERENCE_ENGINE != "process":
+            # Load/warm up the model while the capture threads are already running
+            get_detector()
+        if INFERENCE_ENGINE == "process":
+            process_inference_loop(running, detection_callback, selected)
+        else:
+            inference_loop(running, detection_callback, selected)
+    except Exception as e:
+        # e.g. missing weights or a failed export; start_camera() can retry
+        print("[Camera] pipeline stopped:", e)
+    finally:
+        # Only this run's flag: stops its capture threads before their
+        # captures are released. A newer run waits in start_camera() until
+        # this thread has exited, so the cameras below are still ours
+        running.clear()
+        for t in capture_threads:
+            t.join(timeout=1.0)
+        for camera, cap in zip(selected, caps):
+            cap.release()
+            camera.mailbox.clear()
+            camera.active = False
+
+def start_camera(detection_callback, source=None):
+    """
+    Start the pipeline unless it is already running. A previous run that is
+    still stopping is joined first so two runs never share the cameras;
+    returns False if it does not exit within CAMERA_STOP_TIMEOUT.
+    """
+    global _run_event, _run_thread
+    with _run_lock:
+        if _run_event is not None and _run_event.is_set():
+            return True
+        if _run_thread is not None:
+            _run_thread.join(timeout=CAMERA_STOP_TIMEOUT)
+            if _run_thread.is_alive():
+                print("[Camera] previous run still stopping, not starting a new one")
+                return False
+        _run_event = threading.Event()
+        _run_event.set()
+        _run_thread = threading.Thread(target=camera_loop, args=(_run_event, detection_callback, source),
+                                       daemon=True)
+        _run_thread.start()
+        return True
 
 def stop_camera():
-    camera_event.clear()
+    with _run_lock:
+        if _run_event is not None:
+            _run_event.clear()
+
+def camera_running():
+    """True while a pipeline run is active (False once it stopped, also on errors)."""
+    with _run_lock:
+        return _run_event is not None and _run_event.is_set()
+
+def _render(camera, frame_id, frame, dets):
+    """Draw the overlay for frame_id, reusing the cached one if it was already drawn."""
+    cached_id, cached = camera.annotated
+    if cached_id == frame_id:
+        return cached
+    t0 = time.monotonic()
+    annotated = draw_detections(frame, dets)
+    with camera.lock:
+        if camera.frame_id == frame_id:
+            camera.annotated = (frame_id, annotated)
+    elapsed = time.monotonic() - t0
+    with stats_lock:
+        camera.stats["rendered"] += 1
+        camera.stats["render_ms"] = elapsed * 1000.0
+    _stage_render.observe(elapsed)
+    return annotated
+
+def get_latest_frame(annotated=True, camera=None):
+    """Latest frame of a camera, with the detection overlay unless annotated=False."""
+    frame_id, frame = wait_for_frame(None, timeout=0, annotated=annotated, camera=camera)
+    return frame
+
+def get_latest_detections(camera=None):
+    """(frame_id, Detections) of a camera's latest published frame, or (0, None)."""
+    camera = get_camera(camera)
+    with camera.lock:
+        return camera.frame_id, camera.detections
+
+def wait_for_frame(last_id=None, timeout=None, annotated=True, camera=None):
+    """
+    Block until a camera publishes a frame newer than last_id.
+    Returns (frame_id, frame), or (last_id, None) on timeout.
+    """
+    camera = get_camera(camera)
+    with camera.cond:
+        ready = camera.cond.wait_for(
+            lambda: camera.raw is not None and camera.frame_id != last_id, timeout)
+        if not ready:
+            return last_id, None
+        frame_id, frame, dets = camera.frame_id, camera.raw, camera.detections
+    if not annotated:
+        return frame_id, frame
+    return frame_id, _render(camera, frame_id, frame, dets)
 
-def get_latest_frame():
-    with frame_lock:
-        return latest_frame
+def get_camera_stats(camera=None):
+    camera = get_camera(camera)
+    with stats_lock:
+        out = dict(camera.stats)
+    out.update(camera.motion_gate.stats())
+    out["tracks"] = len(camera.tracker.tracks)
+    out.update(governor.stats())
+    return out
@@ -0,0 +1,95 @@
+# camera/detections.py
+
+import cv2
+import numpy as np
+
+
+class Detections:
+    """
+    Array-backed detections for one frame.
+    boxes: (N, 4) float32 xyxy, scores: (N,), classes: (N,) int,
+    track_ids: (N,) int or None when tracking is off.
+    """
+
+    __slots__ = ("boxes", "scores", "classes", "track_ids", "names")
+
+    def __init__(self, boxes, scores, classes, names, track_ids=None):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.classes = np.asarray(classes, dtype=np.int32).reshape(-1)
+        self.track_ids = None if track_ids is None else np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        self.names = names
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), names or {})
+
+    @classmethod
+    def from_result(cls, result):
+        """Build from an ultralytics Results object."""
+        boxes = result.boxes
+        return cls(
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy(),
+            result.names,
+        )
+
+    @classmethod
+    def from_array(cls, rows, names):
+        """Build from (N, 6) rows of x1, y1, x2, y2, conf, cls (copied)."""
+        rows = np.array(rows, dtype=np.float32, copy=True).reshape(-1, 6)
+        return cls(rows[:, 0:4], rows[:, 4], rows[:, 5], names)
+
+    def __len__(self):
+        return len(self.classes)
+
+    def labels(self):
+        return [self.names[int(c)] for c in self.classes]
+
+    def to_dict(self):
+        """JSON-friendly form, so clients can draw their own overlay on the raw stream."""
+        return {
+            "boxes": self.boxes.astype(float).round(1).tolist(),
+            "scores": self.scores.astype(float).round(3).tolist(),
+            "classes": self.classes.tolist(),
+            "labels": self.labels(),
+            "track_ids": None if self.track_ids is None else self.track_ids.tolist(),
+        }
+
+
+def box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes -> (N, M)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def _color(cls_id):
+    # Stable, distinct-enough BGR colour per class
+    h = (int(cls_id) * 47) % 180
+    hsv = np.uint8([[[h, 200, 255]]])
+    return tuple(int(c) for c in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0])
+
+
+def draw_detections(frame, dets):
+    """Return a copy of frame with boxes, labels and track ids drawn on it."""
+    out = frame.copy()
+    for i in range(len(dets)):
+        x1, y1, x2, y2 = (int(v) for v in dets.boxes[i])
+        cls_id = int(dets.classes[i])
+        color = _color(cls_id)
+        text = f"{dets.names.get(cls_id, cls_id)} {dets.scores[i]:.2f}"
+        if dets.track_ids is not None:
+            text = f"#{dets.track_ids[i]} " + text
+        cv2.rectangle(out, (x1, y1), (x2, y2), color, 2)
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        cv2.rectangle(out, (x1, max(0, y1 - th - 4)), (x1 + tw + 2, y1), color, -1)
+        cv2.putText(out, text, (x1 + 1, max(th, y1 - 3)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+    return out
@@ -0,0 +1,106 @@
+# camera/detector.py
+"""
+Lazily loaded, warmed-up YOLO detector.
+Nothing heavy (torch, ultralytics, onnxruntime, openvino) is imported until the
+first call to get_detector(), so importing the camera modules stays cheap.
+The backend comes from DETECTOR_BACKEND in utils/config.py; ONNX Runtime and
+OpenVINO exports of MODEL_PATH are produced on first use and cached on disk.
+Exports use dynamic input shapes so one call can take a batch of frames from
+several cameras.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.config import MODEL_PATH, DETECTOR_BACKEND, DETECTOR_IMGSZ, DETECTOR_WARMUP_RUNS
+
+# backend name -> ultralytics export format
+EXPORT_FORMATS = {
+    "onnx": "onnx",
+    "openvino": "openvino",
+}
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def _export_target(model_path, backend):
+    stem, _ = os.path.splitext(model_path)
+    if backend == "onnx":
+        return stem + ".onnx"
+    return stem + f"_{backend}_model"
+
+
+def _export_is_fresh(target, meta_path, model_path, imgsz):
+    if not (os.path.exists(target) and os.path.exists(meta_path)):
+        return False
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except Exception:
+        return False
+    return (meta.get("source_mtime") == os.path.getmtime(model_path) and meta.get("imgsz") == imgsz
+            and meta.get("dynamic") is True)
+
+
+def export_model(model_path, backend, imgsz):
+    """
+    Return the path of a `backend` export of model_path, exporting it if the
+    cached copy is missing or older than the .pt weights. Older static-batch
+    exports (no "dynamic" in their sidecar) are re-exported.
+    """
+    if backend not in EXPORT_FORMATS:
+        return model_path
+    target = _export_target(model_path, backend)
+    meta_path = target.rstrip("/\\") + ".meta.json"
+    if _export_is_fresh(target, meta_path, model_path, imgsz):
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"[Detector] exporting {model_path} to {backend} (imgsz={imgsz}), this is done once")
+    t0 = time.monotonic()
+    # dynamic: the default static export only accepts a batch of 1
+    exported = YOLO(model_path).export(format=EXPORT_FORMATS[backend], imgsz=imgsz, dynamic=True)
+    exported = str(exported) if exported else target
+    with open(meta_path, "w") as f:
+        json.dump({"source_mtime": os.path.getmtime(model_path), "imgsz": imgsz, "dynamic": True}, f)
+    print(f"[Detector] export done in {time.monotonic() - t0:.1f}s -> {exported}")
+    return exported
+
+
+def warm_up(model, imgsz, runs=DETECTOR_WARMUP_RUNS):
+    """Run a few dummy inferences so the first real frame doesn't pay for lazy init."""
+    dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(max(runs, 0)):
+        model.predict(source=dummy, imgsz=imgsz, verbose=False)
+
+
+def load_detector(model_path=MODEL_PATH, backend=DETECTOR_BACKEND, imgsz=DETECTOR_IMGSZ):
+    """Load (exporting if needed) and warm up a detector. Prefer get_detector()."""
+    from ultralytics import YOLO
+
+    t0 = time.monotonic()
+    try:
+        path = export_model(model_path, backend, imgsz)
+    except Exception as e:
+        print(f"[Detector] {backend} export failed, falling back to PyTorch:", e)
+        path = model_path
+    model = YOLO(path, task="detect")
+    warm_up(model, imgsz)
+    print(f"[Detector] ready ({backend}, {path}) in {time.monotonic() - t0:.1f}s")
+    return model
+
+
+def get_detector():
+    """Process-wide detector singleton."""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = load_detector()
+    return _detector
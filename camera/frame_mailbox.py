@@ -0,0 +1,65 @@
+# camera/frame_mailbox.py
+
+import threading
+import time
+
+
+class LatestFrameMailbox:
+    """
+    One-slot mailbox between a producer (capture) and a consumer (inference).
+    put() always overwrites the slot, so the consumer only ever sees the
+    freshest frame; a frame replaced before it was taken counts as dropped.
+    Mailboxes sharing one `cond` can be waited on together with wait_any().
+    """
+
+    def __init__(self, cond=None):
+        self._cond = cond or threading.Condition()
+        self._frame = None
+        self._stamp = 0.0
+        self._seq = 0
+        self._taken_seq = 0
+        self.dropped = 0
+
+    def put(self, frame, stamp=None):
+        with self._cond:
+            if self._seq != self._taken_seq:
+                self.dropped += 1
+            self._frame = frame
+            self._stamp = time.monotonic() if stamp is None else stamp
+            self._seq += 1
+            self._cond.notify_all()
+            return self._seq
+
+    @property
+    def pending(self):
+        """True if a frame is waiting to be taken."""
+        return self._seq != self._taken_seq
+
+    def take(self, timeout=None):
+        """
+        Wait for a frame newer than the last one taken.
+        Returns (seq, stamp, frame), or (None, None, None) on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq != self._taken_seq, timeout):
+                return None, None, None
+            self._taken_seq = self._seq
+            return self._seq, self._stamp, self._frame
+
+    def peek(self):
+        """Return the newest (seq, stamp, frame) without consuming it."""
+        with self._cond:
+            return self._seq, self._stamp, self._frame
+
+    def clear(self):
+        with self._cond:
+            self._frame = None
+            self._taken_seq = self._seq
+
+
+def wait_any(mailboxes, timeout=None):
+    """Block until one of mailboxes (all sharing one condition) has a frame waiting."""
+    if not mailboxes:
+        return False
+    with mailboxes[0]._cond:
+        return mailboxes[0]._cond.wait_for(lambda: any(m.pending for m in mailboxes), timeout)
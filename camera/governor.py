@@ -0,0 +1,151 @@
+# camera/governor.py
+"""
+Adaptive inference governor: a feedback controller around the detector that
+holds its latency (and the process' CPU use) under a budget.
+
+The knobs form a single ladder of settings, ordered from best quality to
+cheapest: smaller input sizes, fewer detector runs with the tracker covering
+the frames in between, and finally a lower inference rate. Every `interval`
+seconds the governor looks at the detector runs it was fed and steps one rung
+down if a budget is exceeded, or one rung up after `recover_periods`
+consecutive checks with headroom to spare.
+"""
+
+import collections
+import os
+import threading
+import time
+
+# One rung of the ladder
+Setting = collections.namedtuple("Setting", "imgsz detect_every fps_scale")
+
+
+def build_ladder(imgsz_steps, detect_every=1, max_detect_every=1, fps_steps=()):
+    """
+    imgsz_steps: input sizes, largest first (a single size disables resizing)
+    detect_every .. max_detect_every: detector run interval in frames
+    fps_steps: fractions (< 1) of the configured inference rate
+    """
+    detect_every = max(detect_every, 1)
+    rungs = [Setting(imgsz_steps[0], detect_every, 1.0)]
+    for imgsz in imgsz_steps[1:]:
+        rungs.append(rungs[-1]._replace(imgsz=imgsz))
+    for n in range(detect_every + 1, max_detect_every + 1):
+        rungs.append(rungs[-1]._replace(detect_every=n))
+    for scale in sorted((s for s in fps_steps if 0 < s < 1), reverse=True):
+        rungs.append(rungs[-1]._replace(fps_scale=scale))
+    return rungs
+
+
+def describe(setting):
+    text = f"imgsz={setting.imgsz} detect_every={setting.detect_every}"
+    if setting.fps_scale < 1.0:
+        text += f" fps=x{setting.fps_scale:g}"
+    return text
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+class InferenceGovernor:
+    def __init__(self, ladder, latency_budget_ms, cpu_budget=None, interval=2.0,
+                 headroom=0.7, recover_periods=3, min_samples=3, enabled=True):
+        # latency_budget_ms: p90 detector time to stay under
+        # cpu_budget: process CPU time as a fraction of all cores, None to ignore
+        # headroom: both measures must be below headroom x budget to step back up
+        self.ladder = ladder
+        self.latency_budget_ms = latency_budget_ms
+        self.cpu_budget = cpu_budget
+        self.interval = interval
+        self.headroom = headroom
+        self.recover_periods = recover_periods
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.level = 0
+        self.latency_ms = None   # p90 of the last evaluated window
+        self.cpu = None          # CPU share of the last evaluated window
+        self.steps = {"down": 0, "up": 0}
+        self.adjustments = collections.deque(maxlen=50)
+        self._cores = os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._samples = []
+        self._window_start = None
+        self._cpu_start = None
+        self._calm = 0
+        self._settle = 0
+
+    @property
+    def setting(self):
+        return self.ladder[self.level]
+
+    def reset(self):
+        """Start a fresh measurement window (the current level is kept)."""
+        with self._lock:
+            self._samples = []
+            self._window_start = None
+            self._calm = 0
+
+    def observe(self, infer_ms, now=None):
+        """Feed the duration of one detector run; returns the setting to use next."""
+        if not self.enabled:
+            return self.setting
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._window_start is None:
+                self._window_start, self._cpu_start = now, time.process_time()
+            if self._settle:
+                # First run after a change pays for re-allocating at the new size
+                self._settle -= 1
+            else:
+                self._samples.append(infer_ms)
+            if now - self._window_start >= self.interval and len(self._samples) >= self.min_samples:
+                self._evaluate(now)
+            return self.setting
+
+    def _evaluate(self, now):
+        latency = _percentile(self._samples, 0.9)
+        cpu = (time.process_time() - self._cpu_start) / (now - self._window_start) / self._cores
+        self.latency_ms, self.cpu = latency, cpu
+        self._samples = []
+        self._window_start, self._cpu_start = now, time.process_time()
+
+        cpu_over = self.cpu_budget is not None and cpu > self.cpu_budget
+        cpu_calm = self.cpu_budget is None or cpu < self.cpu_budget * self.headroom
+        if latency > self.latency_budget_ms or cpu_over:
+            self._calm = 0
+            if self.level < len(self.ladder) - 1:
+                self._step(+1, latency, cpu)
+        elif latency < self.latency_budget_ms * self.headroom and cpu_calm:
+            self._calm += 1
+            if self._calm >= self.recover_periods and self.level > 0:
+                self._calm = 0
+                self._step(-1, latency, cpu)
+        else:
+            self._calm = 0
+
+    def _step(self, direction, latency, cpu):
+        old, self.level = self.level, self.level + direction
+        self._settle = 1
+        self.steps["down" if direction > 0 else "up"] += 1
+        self.adjustments.append({
+            "time": time.time(), "from": old, "to": self.level,
+            "setting": self.setting._asdict(), "latency_ms": latency, "cpu": cpu,
+        })
+        budget = f"p90 {latency:.0f}/{self.latency_budget_ms:.0f} ms"
+        if self.cpu_budget is not None:
+            budget += f", cpu {cpu:.0%}/{self.cpu_budget:.0%}"
+        print(f"[Governor] {'down' if direction > 0 else 'up'} {old}->{self.level}: "
+              f"{describe(self.ladder[old])} -> {describe(self.setting)} ({budget})")
+
+    def stats(self):
+        setting = self.setting
+        return {
+            "governor_level": self.level,
+            "governor_imgsz": setting.imgsz,
+            "governor_detect_every": setting.detect_every,
+            "governor_fps_scale": setting.fps_scale,
+            "governor_latency_ms": self.latency_ms,
+            "governor_cpu": self.cpu,
+        }
@@ -0,0 +1,187 @@
+# camera/inference_worker.py
+"""
+Process-backed YOLO inference.
+Frames travel to the worker through a shared-memory ring and detection arrays
+come back the same way; the queues between the two processes only carry slot
+indices and a few scalars. Overlays are drawn on demand by the parent.
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Per-detection row: x1, y1, x2, y2, confidence, class id
+DET_COLS = 6
+
+
+class SharedRing:
+    """A fixed number of equally shaped numpy slots backed by one shared-memory block."""
+
+    def __init__(self, shape, dtype, slots, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getitem__(self, slot):
+        return self.array[slot]
+
+    def close(self):
+        # Drop the view first, SharedMemory refuses to close with exported buffers
+        self.array = None
+        try:
+            self.shm.close()
+            if self._owner:
+                self.shm.unlink()
+        except Exception:
+            pass
+
+
+def _worker_main(model_path, conf, shape, slots, max_det, shm_names, req_q, res_q):
+    """Entry point of the inference process."""
+    from camera.detector import load_detector
+    from utils.config import DETECTOR_BACKEND, DETECTOR_IMGSZ
+
+    frames = SharedRing(shape, np.uint8, slots, name=shm_names[0])
+    dets = SharedRing((max_det, DET_COLS), np.float32, slots, name=shm_names[1])
+
+    model = load_detector(model_path, DETECTOR_BACKEND, DETECTOR_IMGSZ)
+    res_q.put(("ready", model.names))
+
+    try:
+        while True:
+            msg = req_q.get()
+            if msg is None:
+                break
+            slot, seq, stamp, imgsz = msg
+            t0 = time.monotonic()
+            results = model.predict(source=frames[slot], conf=conf, imgsz=imgsz or DETECTOR_IMGSZ,
+                                    verbose=False)
+            boxes = results[0].boxes
+            n = min(len(boxes), max_det)
+            if n:
+                dets[slot][:n, 0:4] = boxes.xyxy[:n].cpu().numpy()
+                dets[slot][:n, 4] = boxes.conf[:n].cpu().numpy()
+                dets[slot][:n, 5] = boxes.cls[:n].cpu().numpy()
+            infer_ms = (time.monotonic() - t0) * 1000.0
+            res_q.put(("result", slot, seq, stamp, n, infer_ms))
+    finally:
+        frames.close()
+        dets.close()
+
+
+class ProcessInferenceEngine:
+    """
+    Parent-side handle for the inference process.
+    Only one frame is in flight at a time so results never lag behind capture;
+    returned arrays are views into shared memory and stay valid until the
+    ring wraps around (slots - 1 newer results).
+    """
+
+    def __init__(self, model_path, conf, slots=3, max_det=100):
+        self.model_path = model_path
+        self.conf = conf
+        self.slots = max(2, slots)
+        self.max_det = max_det
+        self.class_names = {}
+        self._ctx = mp.get_context("spawn")
+        self._proc = None
+        self._shape = None
+        self._next_slot = 0
+        self._in_flight = False
+
+    def _start(self, shape):
+        self._shape = tuple(shape)
+        self.frames = SharedRing(self._shape, np.uint8, self.slots)
+        self.dets = SharedRing((self.max_det, DET_COLS), np.float32, self.slots)
+        self._req_q = self._ctx.Queue()
+        self._res_q = self._ctx.Queue()
+        self._proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.model_path, self.conf, self._shape, self.slots, self.max_det,
+                  (self.frames.name, self.dets.name),
+                  self._req_q, self._res_q),
+            daemon=True,
+        )
+        self._proc.start()
+        # Model loading may take a while (first-time export), but a worker that
+        # died on the way (missing weights, import error) never answers
+        while True:
+            try:
+                _, names = self._res_q.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if not self._proc.is_alive():
+                    code = self._proc.exitcode
+                    self._proc = None
+                    for ring in (self.frames, self.dets):
+                        ring.close()
+                    raise RuntimeError(f"inference worker exited during startup (exit code {code})")
+        self.class_names = names
+        print(f"[InferenceWorker] started pid {self._proc.pid} for {self._shape}")
+
+    @property
+    def busy(self):
+        return self._in_flight
+
+    def submit(self, frame, seq, stamp, imgsz=None):
+        """Copy frame into the next ring slot and hand it to the worker. False if busy."""
+        if self._in_flight:
+            return False
+        if self._proc is None:
+            self._start(frame.shape)
+        elif frame.shape != self._shape:
+            # Camera resolution changed; rebuild the rings
+            self.stop()
+            self._start(frame.shape)
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        self.frames[slot][...] = frame
+        self._req_q.put((slot, seq, stamp, imgsz))
+        self._in_flight = True
+        return True
+
+    def poll(self, timeout=None):
+        """
+        Wait for the in-flight frame.
+        Returns (seq, stamp, detections, infer_ms) or None on timeout.
+        """
+        if not self._in_flight:
+            return None
+        try:
+            _, slot, seq, stamp, n, infer_ms = self._res_q.get(timeout=timeout)
+        except queue.Empty:
+            if not self._proc.is_alive():
+                print("[InferenceWorker] worker died, restarting on next frame")
+                self.stop()
+            return None
+        self._in_flight = False
+        return seq, stamp, self.dets[slot][:n], infer_ms
+
+    def stop(self):
+        if self._proc is None:
+            return
+        try:
+            self._req_q.put(None)
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        except Exception as e:
+            print("[InferenceWorker] stop error:", e)
+        self._proc = None
+        self._in_flight = False
+        for ring in (self.frames, self.dets):
+            ring.close()
@@ -0,0 +1,74 @@
+# camera/motion_gate.py
+
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap change detector placed in front of the YOLO model.
+    Each frame is shrunk to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that was actually inferred; if too few pixels
+    changed the previous detections can be reused.
+    """
+
+    def __init__(self, threshold=0.02, pixel_delta=25, force_interval=2.0, size=(64, 48)):
+        # threshold: fraction of thumbnail pixels that must change to re-detect
+        # pixel_delta: per-pixel gray level change that counts as "changed"
+        # force_interval: seconds after which we re-detect regardless
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.force_interval = force_interval
+        self.size = size
+        self._ref = None
+        self._ref_time = 0.0
+        self.checked = 0
+        self.skipped = 0
+        self.forced = 0
+        self.last_score = 0.0
+
+    def _thumb(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    def should_infer(self, frame, now=None):
+        """True if the frame differs enough from the reference (or the reference is too old)."""
+        now = time.monotonic() if now is None else now
+        thumb = self._thumb(frame)
+        self.checked += 1
+
+        if self._ref is None or self._ref.shape != thumb.shape:
+            self._accept(thumb, now)
+            return True
+
+        changed = np.count_nonzero(np.abs(thumb - self._ref) > self.pixel_delta)
+        self.last_score = float(changed) / thumb.size
+        if self.last_score >= self.threshold:
+            self._accept(thumb, now)
+            return True
+        if self.force_interval and now - self._ref_time >= self.force_interval:
+            self.forced += 1
+            self._accept(thumb, now)
+            return True
+
+        self.skipped += 1
+        return False
+
+    def _accept(self, thumb, now):
+        self._ref = thumb
+        self._ref_time = now
+
+    def reset(self):
+        self._ref = None
+
+    def stats(self):
+        return {
+            "motion_checked": self.checked,
+            "motion_skipped": self.skipped,
+            "motion_forced": self.forced,
+            "motion_score": self.last_score,
+        }
@@ -0,0 +1,112 @@
+# camera/tracker.py
+
+import numpy as np
+
+from camera.detections import Detections, box_iou
+
+
+class _Track:
+    __slots__ = ("id", "box", "vel", "score", "cls", "conf", "missed", "since_measure")
+
+    def __init__(self, track_id, box, score, cls_id):
+        self.id = track_id
+        self.box = box.astype(np.float32)
+        self.vel = np.zeros(4, dtype=np.float32)
+        self.score = float(score)
+        self.cls = int(cls_id)
+        self.conf = 1.0           # tracking confidence, decays between detections
+        self.missed = 0           # consecutive detection frames without a match
+        self.since_measure = 0    # predicted frames since the last detection
+
+
+class IoUTracker:
+    """
+    Greedy IoU association with a constant-velocity box model.
+    update() is fed real detections and assigns stable track ids; predict()
+    carries the boxes forward on frames where the detector is skipped.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=2, decay=0.85, smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.decay = decay
+        self.smoothing = smoothing
+        self.tracks = []
+        self.names = {}
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+
+    def update(self, dets):
+        """Associate detections with tracks; returns dets with track_ids filled in."""
+        self.names = dets.names
+        n = len(dets)
+        ids = np.zeros(n, dtype=np.int64)
+        det_used = np.zeros(n, dtype=bool)
+        track_used = np.zeros(len(self.tracks), dtype=bool)
+
+        if self.tracks and n:
+            track_boxes = np.stack([t.box for t in self.tracks])
+            track_cls = np.array([t.cls for t in self.tracks])
+            iou = box_iou(track_boxes, dets.boxes)
+            iou[track_cls[:, None] != dets.classes[None, :]] = 0.0
+            # Greedy: best overlaps first
+            for flat in np.argsort(-iou, axis=None):
+                ti, di = divmod(int(flat), n)
+                if iou[ti, di] < self.iou_threshold:
+                    break
+                if track_used[ti] or det_used[di]:
+                    continue
+                track_used[ti] = det_used[di] = True
+                self._measure(self.tracks[ti], dets.boxes[di], dets.scores[di])
+                ids[di] = self.tracks[ti].id
+
+        kept = []
+        for t, used in zip(self.tracks, track_used):
+            if not used:
+                t.missed += 1
+                if t.missed > self.max_missed:
+                    continue
+            kept.append(t)
+        for di in np.flatnonzero(~det_used):
+            t = _Track(self._next_id, dets.boxes[di], dets.scores[di], dets.classes[di])
+            self._next_id += 1
+            kept.append(t)
+            ids[di] = t.id
+        self.tracks = kept
+
+        return Detections(dets.boxes, dets.scores, dets.classes, dets.names, track_ids=ids)
+
+    def _measure(self, t, box, score):
+        steps = max(t.since_measure, 1)
+        # since_measure counts predictions already applied, so compare with the raw position
+        measured_vel = (box - (t.box - t.vel * t.since_measure)) / steps
+        t.vel = self.smoothing * t.vel + (1.0 - self.smoothing) * measured_vel
+        t.box = box.astype(np.float32)
+        t.score = float(score)
+        t.conf = 1.0
+        t.missed = 0
+        t.since_measure = 0
+
+    def predict(self):
+        """Advance every visible track one frame and return them as Detections."""
+        visible = [t for t in self.tracks if t.missed == 0]
+        for t in visible:
+            t.box = t.box + t.vel
+            t.since_measure += 1
+            t.conf *= self.decay
+        if not visible:
+            return Detections.empty(self.names)
+        return Detections(
+            np.stack([t.box for t in visible]),
+            [t.score for t in visible],
+            [t.cls for t in visible],
+            self.names,
+            track_ids=[t.id for t in visible],
+        )
+
+    def confidence(self):
+        """Lowest tracking confidence among visible tracks (1.0 when nothing is tracked)."""
+        confs = [t.conf for t in self.tracks if t.missed == 0]
+        return min(confs) if confs else 1.0
@@ -1,6 +1,11 @@
 # detection/alert_logger.py
 
+import threading
 import time
+from collections import OrderedDict
+from utils.config import ALERT_CAPACITY, ALERT_DEBOUNCE_SECONDS
+from detection.alert_store import get_store
+from utils import metrics
 
 # Severity mapping for known hazard classes
 SEVERITY_MAP = {
@@ -18,16 +23,95 @@ SEVERITY_MAP = {
     "person": "Low",        # may be upgraded if PPE missing
 }
 
-alerts = []
+SEVERITY_RANK = {"Low": 0, "Moderate": 1, "High": 2}
 
-def log_detection(label, location="Unknown", ppe_violation=False):
+
+class Alert:
+    """One (possibly coalesced) alert: repeats of label@location inside the debounce window bump count/last_seen."""
+
+    __slots__ = ("label", "severity", "location", "track_id", "first_seen", "last_seen", "count",
+                 "ppe_violation", "missing_ppe", "row_id", "pending")
+
+    def __init__(self, label, severity, location, track_id, now, missing_ppe=(), ppe_violation=False):
+        self.label = label
+        self.severity = severity
+        self.location = location
+        self.track_id = track_id
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 1
+        self.ppe_violation = ppe_violation
+        self.missing_ppe = tuple(missing_ppe or ())
+        self.row_id = None      # set by the alert store once persisted
+        self.pending = False    # queued for the store's writer thread
+
+    def to_dict(self):
+        return {
+            "time": time.strftime("%H:%M:%S", time.localtime(self.first_seen)),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.first_seen)),
+            "label": self.label,
+            "severity": self.severity,
+            "location": self.location,
+            "track_id": self.track_id,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "count": self.count,
+            "ppe_violation": self.ppe_violation,
+            "missing_ppe": list(self.missing_ppe),
+        }
+
+
+class AlertRing:
+    """Fixed-capacity ring of Alert records; the oldest alert is overwritten when full."""
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._slots = [None] * self.capacity
+        self._head = 0      # next write position
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, alert):
+        """Store alert; returns the evicted one (or None)."""
+        evicted = self._slots[self._head] if self._size == self.capacity else None
+        self._slots[self._head] = alert
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return evicted
+
+    def newest(self, n):
+        """Up to n alerts, newest first; O(n)."""
+        n = min(max(n, 0), self._size)
+        return [self._slots[(self._head - 1 - i) % self.capacity] for i in range(n)]
+
+    def clear(self):
+        self._slots = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+
+
+alerts = AlertRing(ALERT_CAPACITY)
+_lock = threading.Lock()
+
+# (label, location, ppe_violation) -> open Alert that repeats are coalesced into
+_open = {}
+
+# Track ids that already produced an alert (oldest forgotten first)
+MAX_LOGGED_TRACKS = 1024
+_logged_tracks = OrderedDict()
+
+def log_detection(label, location="Unknown", ppe_violation=False, track_id=None, missing_ppe=None):
     """
     Log a detection with timestamp, label, severity, and location.
     :param label: Detected object label
     :param location: Location string (default 'Unknown')
     :param ppe_violation: If True, auto-upgrade severity for missing PPE
+    :param track_id: Tracker id; each tracked object is only logged once
+    :param missing_ppe: PPE items the person is missing (with ppe_violation)
     """
-    timestamp = time.strftime("%H:%M:%S")
+    now = time.time()
     label_lower = str(label).lower()
 
     # Determine severity from map
@@ -37,15 +121,49 @@ def log_detection(label, location="Unknown", ppe_violation=False):
     if label_lower == "person" and ppe_violation:
         severity = "Moderate"
 
-    alerts.append({
-        "time": timestamp,
-        "label": label,
-        "severity": severity,
-        "location": location
-    })
+    with _lock:
+        if track_id is not None:
+            # Track ids are per camera, so qualify them with its location
+            key = (location, track_id, ppe_violation)
+            if key in _logged_tracks:
+                return
+            _logged_tracks[key] = True
+            if len(_logged_tracks) > MAX_LOGGED_TRACKS:
+                _logged_tracks.popitem(last=False)
+
+        # Coalesce repeats of the same label/location within the debounce window;
+        # PPE violations stay separate from plain detections of the same label
+        key = (label_lower, location, bool(ppe_violation))
+        alert = _open.get(key)
+        if alert is not None and now - alert.last_seen <= ALERT_DEBOUNCE_SECONDS:
+            alert.last_seen = now
+            alert.count += 1
+            if SEVERITY_RANK.get(severity, 1) > SEVERITY_RANK.get(alert.severity, 1):
+                alert.severity = severity
+            if missing_ppe:
+                alert.missing_ppe = tuple(dict.fromkeys(alert.missing_ppe + tuple(missing_ppe)))
+        else:
+            alert = Alert(label, severity, location, track_id, now, missing_ppe, bool(ppe_violation))
+            metrics.counter("detection_alerts_total", "New (non-coalesced) alerts",
+                            {"severity": severity}).inc()
+            _open[key] = alert
+            evicted = alerts.append(alert)
+            if evicted is not None:
+                evicted_key = (str(evicted.label).lower(), evicted.location, evicted.ppe_violation)
+                if _open.get(evicted_key) is evicted:
+                    del _open[evicted_key]
+
+    # Persist (non-blocking; the store batches writes on its own thread)
+    store = get_store()
+    if store is not None:
+        store.submit(alert)
 
 def get_recent_alerts(n=10):
-    return alerts[-n:][::-1]
+    with _lock:
+        return [a.to_dict() for a in alerts.newest(n)]
 
 def clear_alerts():
-    alerts.clear()
+    with _lock:
+        alerts.clear()
+        _open.clear()
+        _logged_tracks.clear()
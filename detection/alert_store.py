@@ -0,0 +1,244 @@
+# detection/alert_store.py
+"""
+Durable alert history in SQLite (WAL mode).
+log_detection() only enqueues; a background writer thread batches inserts and
+updates into one transaction, so the camera loop never waits on disk.
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+from utils.config import ALERT_DB_PATH, ALERT_DB_BATCH_SIZE, ALERT_DB_FLUSH_INTERVAL, ALERT_DB_QUEUE_SIZE
+from utils import metrics
+
+_batch_seconds = metrics.histogram("alert_store_batch_seconds", "SQLite alert batch write time")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id          INTEGER PRIMARY KEY,
+    first_seen  REAL NOT NULL,
+    last_seen   REAL NOT NULL,
+    label       TEXT NOT NULL,
+    severity    TEXT NOT NULL,
+    location    TEXT,
+    track_id    INTEGER,
+    count       INTEGER NOT NULL DEFAULT 1,
+    missing_ppe TEXT,
+    ppe_violation INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_time ON alerts (first_seen);
+CREATE INDEX IF NOT EXISTS idx_alerts_label_time ON alerts (label, first_seen);
+CREATE INDEX IF NOT EXISTS idx_alerts_severity_time ON alerts (severity, first_seen);
+"""
+
+COLUMNS = ("id", "first_seen", "last_seen", "label", "severity", "location", "track_id", "count", "missing_ppe",
+           "ppe_violation")
+
+# Columns added after the first schema; (name, type) added to older databases on open
+MIGRATIONS = (("missing_ppe", "TEXT"), ("ppe_violation", "INTEGER NOT NULL DEFAULT 0"))
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class AlertStore:
+    def __init__(self, path, batch_size=256, flush_interval=0.5, queue_size=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self.written = 0
+        self.dropped = 0
+        conn = _connect(path)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(alerts)")}
+        if existing:
+            for name, col_type in MIGRATIONS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE alerts ADD COLUMN {name} {col_type}")
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._running = True
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        metrics.gauge("alert_store_queue_depth", "Alerts waiting to be written", fn=self._queue.qsize)
+        metrics.counter("alert_store_dropped_total", "Alerts dropped on a full write queue",
+                        fn=lambda: self.dropped)
+
+    # --- writing -----------------------------------------------------------
+
+    def submit(self, alert):
+        """Queue an Alert for insert/update; never blocks. Returns False if dropped."""
+        if alert.pending:
+            # Already queued; the writer reads the latest field values
+            return True
+        alert.pending = True
+        try:
+            self._queue.put_nowait(alert)
+            return True
+        except queue.Full:
+            alert.pending = False
+            self.dropped += 1
+            return False
+
+    def _writer(self):
+        conn = _connect(self.path)
+        while self._running or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            t0 = time.monotonic()
+            try:
+                self._write_batch(conn, batch)
+                _batch_seconds.observe(time.monotonic() - t0)
+            except Exception as e:
+                print("[AlertStore] write error:", e)
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        with conn:
+            for alert in batch:
+                alert.pending = False
+                if alert.row_id is None:
+                    cur = conn.execute(
+                        "INSERT INTO alerts (first_seen, last_seen, label, severity, location, track_id, count,"
+                        " missing_ppe, ppe_violation) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (alert.first_seen, alert.last_seen, str(alert.label), alert.severity,
+                         alert.location, alert.track_id, alert.count, _join(alert.missing_ppe),
+                         int(alert.ppe_violation)))
+                    alert.row_id = cur.lastrowid
+                else:
+                    conn.execute(
+                        "UPDATE alerts SET last_seen = ?, severity = ?, count = ?, missing_ppe = ? WHERE id = ?",
+                        (alert.last_seen, alert.severity, alert.count, _join(alert.missing_ppe), alert.row_id))
+        self.written += len(batch)
+
+    def close(self, timeout=2.0):
+        """Stop the writer once the queue is drained (waits up to timeout)."""
+        self._running = False
+        self._thread.join(timeout=timeout)
+
+    # --- reading -----------------------------------------------------------
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _where(start, end, severity, label, ppe_violation=None):
+        clauses, args = [], []
+        if start is not None:
+            clauses.append("first_seen >= ?")
+            args.append(start)
+        if end is not None:
+            clauses.append("first_seen < ?")
+            args.append(end)
+        if severity is not None:
+            severities = [severity] if isinstance(severity, str) else list(severity)
+            clauses.append(f"severity IN ({','.join('?' * len(severities))})")
+            args.extend(severities)
+        if label is not None:
+            clauses.append("label = ?")
+            args.append(label)
+        if ppe_violation is not None:
+            clauses.append("ppe_violation = ?")
+            args.append(int(ppe_violation))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, start=None, end=None, severity=None, label=None, limit=100, offset=0,
+              ppe_violation=None):
+        """
+        Alerts newest first. start/end are epoch seconds; severity may be a list;
+        ppe_violation=True/False keeps only PPE violations / plain detections.
+        """
+        where, args = self._where(start, end, severity, label, ppe_violation)
+        rows = self._reader().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM alerts{where} ORDER BY first_seen DESC LIMIT ? OFFSET ?",
+            args + [int(limit), int(offset)]).fetchall()
+        return [_row_to_dict(r) for r in rows]
+
+    def count(self, start=None, end=None, severity=None, label=None, ppe_violation=None):
+        where, args = self._where(start, end, severity, label, ppe_violation)
+        return self._reader().execute(f"SELECT COUNT(*) FROM alerts{where}", args).fetchone()[0]
+
+    def counts_by_label(self, start=None, end=None, severity=None, ppe_violation=None):
+        """{label: (alerts, detections)} over the range."""
+        where, args = self._where(start, end, severity, None, ppe_violation)
+        rows = self._reader().execute(
+            f"SELECT label, COUNT(*), SUM(count) FROM alerts{where} GROUP BY label", args).fetchall()
+        return {label: (n, total) for label, n, total in rows}
+
+
+def _join(items):
+    return ",".join(items) if items else None
+
+
+def _row_to_dict(row):
+    d = dict(zip(COLUMNS, row))
+    d["missing_ppe"] = d["missing_ppe"].split(",") if d["missing_ppe"] else []
+    d["ppe_violation"] = bool(d["ppe_violation"])
+    d["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(d["first_seen"]))
+    return d
+
+
+_store = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store, opened on first use; None when ALERT_DB_PATH is unset."""
+    global _store, _store_failed
+    if _store is None and ALERT_DB_PATH and not _store_failed:
+        with _store_lock:
+            if _store is None and not _store_failed:
+                try:
+                    _store = AlertStore(ALERT_DB_PATH, ALERT_DB_BATCH_SIZE,
+                                        ALERT_DB_FLUSH_INTERVAL, ALERT_DB_QUEUE_SIZE)
+                    # The writer is a daemon thread: flush what is still queued on exit
+                    atexit.register(_store.close)
+                except Exception as e:
+                    print("[AlertStore] open failed, alerts stay in memory only:", e)
+                    _store_failed = True
+    return _store
+
+
+def close_store():
+    """Flush and stop the store if it was opened."""
+    if _store is not None:
+        _store.close()
+
+
+def query_alerts(start=None, end=None, severity=None, label=None, limit=100, offset=0, ppe_violation=None):
+    store = get_store()
+    return store.query(start, end, severity, label, limit, offset, ppe_violation) if store else []
+
+
+def count_alerts(start=None, end=None, severity=None, label=None, ppe_violation=None):
+    store = get_store()
+    return store.count(start, end, severity, label, ppe_violation) if store else 0
+
+
+def alert_counts_by_label(start=None, end=None, severity=None, ppe_violation=None):
+    store = get_store()
+    return store.counts_by_label(start, end, severity, ppe_violation) if store else {}
@@ -0,0 +1,85 @@
+# detection/ppe_analysis.py
+"""
+Per-frame PPE compliance check.
+All person boxes are compared against all PPE boxes in one vectorized pass:
+a PPE item belongs to a person when most of the item's box lies inside the
+person's box. People missing any required item are reported as violations.
+"""
+
+import numpy as np
+
+
+def containment_matrix(outer, inner):
+    """
+    Fraction of each inner box covered by each outer box.
+    outer: (N, 4), inner: (M, 4) xyxy -> (N, M) in [0, 1].
+    """
+    outer = np.asarray(outer, dtype=np.float32).reshape(-1, 4)
+    inner = np.asarray(inner, dtype=np.float32).reshape(-1, 4)
+    tl = np.maximum(outer[:, None, :2], inner[None, :, :2])
+    br = np.minimum(outer[:, None, 2:], inner[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_inner = np.prod(np.clip(inner[:, 2:] - inner[:, :2], 0, None), axis=1)
+    return inter / np.maximum(area_inner[None, :], 1e-6)
+
+
+class PPEAnalyzer:
+    def __init__(self, required_items, person_label="person", threshold=0.6):
+        self.required = tuple(item.lower() for item in required_items)
+        self.person_label = person_label.lower()
+        self.threshold = threshold
+        self._names = None
+        self._person_ids = None
+        self._item_index = None  # class id -> column in the required-items matrix
+
+    def _bind(self, names):
+        """Cache class-id lookups; names only change when the model does."""
+        if names is self._names:
+            return
+        self._names = names
+        lowered = {int(k): str(v).lower() for k, v in names.items()}
+        self._person_ids = np.array([k for k, v in lowered.items() if v == self.person_label])
+        n_classes = max(lowered) + 1 if lowered else 0
+        self._item_index = np.full(n_classes, -1, dtype=np.int64)
+        for k, v in lowered.items():
+            if v in self.required:
+                self._item_index[k] = self.required.index(v)
+
+    def analyze(self, dets):
+        """
+        Returns [(detection_index, track_id or None, missing_items)] for every
+        person lacking at least one required item.
+        """
+        if not self.required or len(dets) == 0:
+            return []
+        self._bind(dets.names)
+        if self._person_ids.size == 0:
+            return []
+
+        is_person = np.isin(dets.classes, self._person_ids)
+        if not is_person.any():
+            return []
+        person_idx = np.flatnonzero(is_person)
+
+        cls = dets.classes
+        in_range = (cls >= 0) & (cls < len(self._item_index))
+        item_col = np.full(len(cls), -1, dtype=np.int64)
+        item_col[in_range] = self._item_index[cls[in_range]]
+        item_idx = np.flatnonzero(item_col >= 0)
+
+        # has[p, k]: person p wears required item k
+        has = np.zeros((len(person_idx), len(self.required)), dtype=bool)
+        if item_idx.size:
+            worn = containment_matrix(dets.boxes[person_idx], dets.boxes[item_idx]) >= self.threshold
+            one_hot = np.zeros((item_idx.size, len(self.required)), dtype=bool)
+            one_hot[np.arange(item_idx.size), item_col[item_idx]] = True
+            has = (worn.astype(np.int32) @ one_hot.astype(np.int32)) > 0
+
+        violators = np.flatnonzero(~has.all(axis=1))
+        out = []
+        for p in violators:
+            det_i = int(person_idx[p])
+            track_id = None if dets.track_ids is None else int(dets.track_ids[det_i])
+            missing = tuple(item for item, ok in zip(self.required, has[p]) if not ok)
+            out.append((det_i, track_id, missing))
+        return out
@@ -1,11 +1,16 @@
 # main.py
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
-from camera.camera_handler import start_camera, stop_camera, get_latest_frame
-from detection.alert_logger import log_detection, get_recent_alerts, clear_alerts
+from bridge.protocol import (
+    BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL, MSG_TELEMETRY,
+    decode_telemetry, encode_client_message,
+)
 import json
+import random
 import threading
 import time
+from collections import deque
+import urllib.parse
+import urllib.request
 
 try:
     import websocket
@@ -14,72 +19,256 @@ except Exception:
 
 # === CONFIG ===
 WS_URL = "ws://localhost:8000/ws"
+BRIDGE_HTTP_URL = "http://localhost:8000"
+# The camera pipeline runs in the bridge and the viewer's browser loads its
+# video directly, so this must be an address the browser can reach
+BRIDGE_VIDEO_URL = BRIDGE_HTTP_URL
+# Commands queued while the bridge is unreachable (oldest dropped beyond this)
+WS_SEND_QUEUE = 32
+# Queued drive commands older than this (seconds) are dropped instead of sent
+# late after a reconnect; stop and mode changes are always delivered
+WS_COMMAND_MAX_AGE = 2.0
+# Seconds between pings; a link silent for 3 heartbeats is reconnected
+WS_HEARTBEAT = 2.0
+# Panel refresh periods (seconds); controls only rerun on interaction
+# The video streams on its own; the feed panel only follows cameras starting/stopping
+VIDEO_REFRESH = 2.0
+TELEMETRY_REFRESH = 0.5
+TREND_REFRESH = 5.0
+ALERTS_REFRESH = 2.0
+DIAGNOSTICS_REFRESH = 2.0
+
+def bridge_request(path, method="GET", timeout=1):
+    """JSON response of a bridge endpoint, or None if unavailable or refused."""
+    try:
+        request = urllib.request.Request(f"{BRIDGE_HTTP_URL}{path}", method=method)
+        with urllib.request.urlopen(request, timeout=timeout) as r:
+            return json.loads(r.read())
+    except Exception:
+        return None
+
+def fetch_history(channel, seconds=120, points=200):
+    """Downsampled telemetry series from the bridge, or None if unavailable."""
+    query = urllib.parse.urlencode({"channel": channel, "from": -seconds, "points": points})
+    return bridge_request(f"/telemetry/history?{query}")
+
+def fetch_bridge_metrics():
+    """Bridge metrics snapshot (see utils/metrics.py), or None if unavailable."""
+    return bridge_request("/metrics?format=json")
+
+def _metric(snapshot, key, field=None):
+    value = (snapshot or {}).get(key)
+    if field and isinstance(value, dict):
+        value = value.get(field)
+    return value
+
+def _fmt(value, unit="", digits=1):
+    return "n/a" if value is None else f"{value:.{digits}f}{unit}"
 
 # === WebSocket client wrapper ===
 class WSClient:
-    def __init__(self, url):
+    """
+    One long-lived connection to the bridge. A receive thread (re)connects
+    with backoff and keeps the latest telemetry; a send thread drains a
+    bounded queue (oldest dropped when full, stale drive commands expired)
+    and pings the bridge every heartbeat to measure round-trip time and
+    detect dead links.
+    """
+
+    def __init__(self, url, send_queue=WS_SEND_QUEUE, heartbeat=WS_HEARTBEAT,
+                 backoff_initial=0.5, backoff_max=10.0, command_max_age=WS_COMMAND_MAX_AGE):
         self.url = url
         self.ws = None
-        self.lock = threading.Lock()
         self.last_telemetry = None
-        self._stop = False
-        self._thread = None
-        self._connect()
-
-    def _connect(self):
-        if websocket is None:
-            print("websocket-client not installed")
-            return
-        try:
-            self.ws = websocket.WebSocket()
-            self.ws.connect(self.url, timeout=3)
-            # start listener thread
-            self._thread = threading.Thread(target=self._recv_loop, daemon=True)
-            self._thread.start()
-        except Exception as e:
-            print("WS connect failed:", e)
-            self.ws = None
-
-    def _recv_loop(self):
-        while not self._stop and self.ws:
+        self.last_message_time = None
+        self.binary = False
+        self.heartbeat = heartbeat
+        self._backoff = (backoff_initial, backoff_max)
+        self._cond = threading.Condition()
+        self._outbox = deque()   # (payload, monotonic time queued)
+        self._send_queue = send_queue
+        self._command_max_age = command_max_age
+        self._stop = threading.Event()
+        self._last_ping = 0.0
+        self.connected = False
+        self.reconnects = 0
+        self.sent = 0
+        self.dropped = 0
+        self.expired = 0
+        self.rtt_ms = None
+        self.rtt_avg_ms = None
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True),
+            threading.Thread(target=self._send_loop, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    # --- connection / receive thread ---
+
+    def _open(self):
+        ws = websocket.WebSocket(enable_multithread=True)
+        # Prefer the compact binary protocol; old bridges just ignore the offer
+        ws.connect(self.url, timeout=3, subprotocols=[BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL])
+        # Pongs and telemetry keep arriving on a live link; silence means it's dead
+        ws.settimeout(self.heartbeat * 3)
+        return ws
+
+    def _run(self):
+        delay = self._backoff[0]
+        connects = 0
+        while not self._stop.is_set():
+            try:
+                ws = self._open()
+            except Exception as e:
+                print("WS connect failed:", e)
+                self._stop.wait(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, self._backoff[1])
+                continue
+            delay = self._backoff[0]
+            connects += 1
+            self.reconnects = connects - 1
+            with self._cond:
+                self.ws = ws
+                self.binary = ws.getsubprotocol() == BINARY_SUBPROTOCOL
+                self.connected = True
+                self._cond.notify_all()
+            self._recv_loop(ws)
+            with self._cond:
+                self.connected = False
+                self.ws = None
             try:
-                txt = self.ws.recv()
-                if txt:
-                    obj = json.loads(txt)
+                ws.close()
+            except Exception:
+                pass
+
+    def _recv_loop(self, ws):
+        while not self._stop.is_set():
+            try:
+                opcode, data = ws.recv_data(control_frame=True)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print("WS connection lost:", e)
+                return
+            now = time.monotonic()
+            self.last_message_time = now
+            try:
+                if opcode == websocket.ABNF.OPCODE_PONG:
+                    self._record_rtt(now - float(data))
+                elif opcode == websocket.ABNF.OPCODE_BINARY:
+                    if data and data[0] == MSG_TELEMETRY:
+                        self.last_telemetry, _ = decode_telemetry(data)
+                elif opcode == websocket.ABNF.OPCODE_TEXT:
+                    obj = json.loads(data)
                     if obj.get("type") == "telemetry":
                         self.last_telemetry = obj.get("data")
-            except Exception:
-                time.sleep(0.1)
+                elif opcode == websocket.ABNF.OPCODE_CLOSE:
+                    return
+            except Exception as e:
+                print("WS bad message:", e)
+
+    def _record_rtt(self, seconds):
+        ms = seconds * 1000.0
+        self.rtt_ms = ms
+        self.rtt_avg_ms = ms if self.rtt_avg_ms is None else 0.8 * self.rtt_avg_ms + 0.2 * ms
+
+    # --- send thread ---
+
+    def _next_payload(self):
+        """Oldest queued payload still worth sending (caller holds _cond)."""
+        while self._outbox:
+            payload, queued = self._outbox.popleft()
+            drive = payload.get("type") == "command" and payload.get("data") != "stop"
+            if drive and time.monotonic() - queued > self._command_max_age:
+                # Pressed too long ago to move the robot now
+                self.expired += 1
+                continue
+            return payload, queued
+        return None
+
+    def _send_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stop.is_set() or (self.connected and self._outbox),
+                    timeout=self.heartbeat)
+                ws = self.ws if self.connected else None
+                item = self._next_payload() if ws else None
+            if ws is None:
+                continue
+            payload = item[0] if item else None
+            try:
+                if payload is not None:
+                    if self.binary:
+                        ws.send_binary(encode_client_message(payload))
+                    else:
+                        ws.send(json.dumps(payload))
+                    self.sent += 1
+                now = time.monotonic()
+                if now - self._last_ping >= self.heartbeat:
+                    self._last_ping = now
+                    ws.ping(repr(now))
+            except Exception as e:
+                print("WS send error:", e)
+                with self._cond:
+                    if item is not None:
+                        # Keeps its original time, so it can still expire
+                        self._outbox.appendleft(item)
+                # Unblocks the receive thread, which reconnects
+                try:
+                    ws.abort()
+                except Exception:
+                    pass
 
     def send(self, payload: dict):
-        if not self.ws:
-            return False
-        try:
-            with self.lock:
-                self.ws.send(json.dumps(payload))
-            return True
-        except Exception as e:
-            print("WS send error:", e)
-            return False
+        """Queue payload for the bridge; never blocks. Sent once connected."""
+        with self._cond:
+            if len(self._outbox) >= self._send_queue:
+                # Make room by dropping the oldest entry that isn't a stop
+                victim = next((item for item in self._outbox if item[0].get("data") != "stop"),
+                              self._outbox[0])
+                self._outbox.remove(victim)
+                self.dropped += 1
+            self._outbox.append((payload, time.monotonic()))
+            self._cond.notify_all()
+        return self.connected
 
     def get_telemetry(self):
         return self.last_telemetry
 
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "queued": len(self._outbox),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "rtt_ms": self.rtt_ms,
+            "rtt_avg_ms": self.rtt_avg_ms,
+        }
+
     def close(self):
-        self._stop = True
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+            ws = self.ws
         try:
-            if self.ws:
-                self.ws.close()
-        except:
+            if ws:
+                ws.abort()
+        except Exception:
             pass
 
 # === Start WS client ===
-ws_client = None
-try:
-    ws_client = WSClient(WS_URL)
-except Exception as e:
-    st.warning(f"Could not start WS client: {e}")
-    ws_client = None
+@st.cache_resource
+def get_ws_client():
+    """One client per Streamlit process, shared by every session and rerun."""
+    if websocket is None:
+        print("websocket-client not installed")
+        return None
+    return WSClient(WS_URL)
+
+ws_client = get_ws_client()
 
 # === Page ===
 st.set_page_config(layout="wide")
@@ -127,24 +316,38 @@ with col1:
 with col2:
     st.subheader("🎮 Camera Control")
     cam_col1, cam_col2 = st.columns(2)
+    # The pipeline runs in the bridge; starting may wait for a previous run to stop
     with cam_col1:
         if st.button("▶️ Start Camera"):
-            start_camera(log_detection)
+            if bridge_request("/camera/start", method="POST", timeout=10) is None:
+                st.warning("Camera not started (bridge unreachable or still stopping)")
     with cam_col2:
         if st.button("⏹ Stop Camera"):
-            stop_camera()
+            if bridge_request("/camera/stop", method="POST") is None:
+                st.warning("Bridge unreachable")
 
-# LIVE CAMERA
-st.subheader("📷 Live Feed with Detection")
-frame = get_latest_frame()
-if frame is not None:
-    st.image(frame, channels="BGR", caption="Live Annotated Feed")
-else:
-    st.info("Camera not active. Click 'Start Camera' to begin.")
+# === Live panels ===
+# Each panel is a fragment that reruns on its own timer; the rest of the page
+# (title, controls) only reruns on interaction.
 
-# SIDEBAR TELEMETRY & ALERTS
-with st.sidebar:
-    st.header("📡 Telemetry")
+@st.fragment(run_every=VIDEO_REFRESH)
+def live_feed_panel():
+    # One column per active camera, captioned with its location. The browser
+    # pulls the bridge's encode-once MJPEG stream; the URL stays the same
+    # across reruns, so the stream is not reopened
+    registered = bridge_request("/cameras") or []
+    active = [cam for cam in registered if cam["active"]]
+    if not active:
+        st.info("Camera not active. Click 'Start Camera' to begin.")
+        return
+    for col, cam in zip(st.columns(len(active)), active):
+        caption = ("Live Annotated Feed" if len(registered) == 1
+                   else f"Live Annotated Feed ({cam['location']})")
+        query = urllib.parse.urlencode({"camera": cam["name"]})
+        col.image(f"{BRIDGE_VIDEO_URL}/video.mjpg?{query}", caption=caption)
+
+@st.fragment(run_every=TELEMETRY_REFRESH)
+def telemetry_panel():
     telemetry = ws_client.get_telemetry() if ws_client else None
     if telemetry:
         ultra_l = telemetry.get("ultrasonic_left")
@@ -157,19 +360,80 @@ with st.sidebar:
             st.write(imu.get("orientation"))
     else:
         st.markdown("_No telemetry yet_")
+    if ws_client:
+        link = ws_client.stats()
+        rtt = f"{link['rtt_avg_ms']:.1f} ms" if link["rtt_avg_ms"] is not None else "n/a"
+        status = "connected" if link["connected"] else "reconnecting"
+        st.caption(f"Bridge link: {status} · RTT {rtt} · reconnects {link['reconnects']}")
 
-    st.header("🚨 Detection Alerts")
+@st.fragment(run_every=TREND_REFRESH)
+def trend_panel():
+    # Trends over the last couple of minutes (downsampled on the bridge)
+    left = fetch_history("ultrasonic_left")
+    right = fetch_history("ultrasonic_right")
+    if left and right and (left["t"] or right["t"]):
+        st.markdown("**Ultrasonic trend (cm)**")
+        st.line_chart({
+            "left": dict(zip(left["t"], left["v"])),
+            "right": dict(zip(right["t"], right["v"])),
+        })
+
+@st.fragment(run_every=ALERTS_REFRESH)
+def alerts_panel():
+    # Detections are logged where the camera runs, i.e. in the bridge
     if st.button("🧹 Clear Alerts"):
-        clear_alerts()
-    alerts = get_recent_alerts(10)
+        bridge_request("/alerts/clear", method="POST")
+    alerts = bridge_request("/alerts?n=10")
     if alerts:
         for alert in alerts:
-            st.markdown(f"**[{alert['time']}]** `{alert['label'].upper()}` - *{alert['severity']}*")
+            repeat = f" ×{alert['count']}" if alert.get("count", 1) > 1 else ""
+            missing = f" - missing {', '.join(alert['missing_ppe'])}" if alert.get("missing_ppe") else ""
+            st.markdown(f"**[{alert['time']}]** `{alert['label'].upper()}`{repeat} - *{alert['severity']}*{missing}")
     else:
         st.markdown("No alerts")
 
-# AUTO-REFRESH the feed & telemetry
-st_autorefresh(interval=1000, limit=None, key="feed-refresh")
+@st.fragment(run_every=DIAGNOSTICS_REFRESH)
+def diagnostics_panel():
+    # The camera pipeline runs in the bridge too, so every number comes over HTTP
+    bridge = fetch_bridge_metrics()
+    if bridge is None:
+        st.caption("Bridge metrics unavailable")
+        return
+    frames = 'camera_frames_total{outcome="%s"}'
+    published = sum(_metric(bridge, frames % k, "rate") or 0.0 for k in ("inferred", "reused", "tracked"))
+    dropped = _metric(bridge, "camera_frames_dropped_total", "value") or 0
+    c1, c2 = st.columns(2)
+    c1.metric("Capture FPS", _fmt(_metric(bridge, frames % "captured", "rate")))
+    c2.metric("Output FPS", _fmt(published))
+    c1.metric("Inference p95", _fmt(_metric(bridge, 'camera_stage_seconds{stage="inference"}', "p95_ms"), " ms"))
+    c2.metric("Frame latency p95",
+              _fmt(_metric(bridge, 'camera_stage_seconds{stage="capture_to_publish"}', "p95_ms"), " ms"))
+    c1.metric("Render p95", _fmt(_metric(bridge, 'camera_stage_seconds{stage="render"}', "p95_ms"), " ms"))
+    c2.metric("Dropped frames", f"{dropped:.0f}")
+    c1, c2 = st.columns(2)
+    c1.metric("WS clients", _fmt(_metric(bridge, "bridge_ws_clients"), digits=0))
+    c2.metric("WS msgs/s", _fmt(_metric(bridge, "bridge_ws_messages_total", "rate")))
+    c1.metric("Command p95",
+              _fmt(_metric(bridge, 'bridge_command_latency_seconds{kind="command"}', "p95_ms"), " ms"))
+    c2.metric("Serial B/s", _fmt(_metric(bridge, "serial_bytes_read_total", "rate"), digits=0))
+    c1.metric("IMU Hz", _fmt(_metric(bridge, 'ros_messages_total{topic="imu"}', "rate")))
+    c2.metric("Ultrasonic Hz", _fmt(_metric(bridge, 'ros_messages_total{topic="ultrasonic_left"}', "rate")))
+
+# LIVE CAMERA
+st.subheader("📷 Live Feed with Detection")
+live_feed_panel()
+
+# SIDEBAR TELEMETRY & ALERTS
+with st.sidebar:
+    st.header("📡 Telemetry")
+    telemetry_panel()
+    trend_panel()
+
+    st.header("🚨 Detection Alerts")
+    alerts_panel()
+
+    with st.expander("🩺 Diagnostics"):
+        diagnostics_panel()
 
 # Footer
 st.markdown("---")
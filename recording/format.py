@@ -0,0 +1,210 @@
+# recording/format.py
+"""
+On-disk layout of a recorded inspection run. A recording is a directory:
+
+    meta.json               start/end time, counts, config snapshot
+    frames-00000.bin ...    JPEG frames, concatenated; a new chunk file is
+                            started every RECORDING_CHUNK_BYTES
+    frames.idx              one INDEX_DTYPE record per frame
+    events-00000.bin ...    commands, modes and detections as UTF-8 JSON
+    events.idx
+    telemetry.rec           one TELEMETRY_DTYPE record per sample
+
+Index and telemetry files are flat arrays of fixed-size little-endian records,
+so readers memory-map them and seek with a binary search on the stamp column;
+payloads are read through mmaps of the chunk files.
+"""
+
+import json
+import mmap
+import os
+
+import cv2
+import numpy as np
+
+from bridge.telemetry_state import TOPICS, IMU_WIDTH
+
+FORMAT_VERSION = 1
+
+INDEX_DTYPE = np.dtype([
+    ("stamp", "<f8"),     # epoch seconds
+    ("offset", "<u8"),    # byte offset inside the chunk
+    ("size", "<u4"),
+    ("chunk", "<u2"),
+    ("kind", "<u2"),      # KIND_* for events, 0 for frames
+])
+
+TOPIC_IDS = {topic: i for i, topic in enumerate(TOPICS)}
+TOPIC_NAMES = list(TOPICS)
+TELEMETRY_DTYPE = np.dtype([
+    ("stamp", "<f8"),
+    ("topic", "<u1"),
+    ("values", "<f8", (IMU_WIDTH,)),   # scalar topics use values[0]
+])
+
+KIND_FRAME = 0
+KIND_COMMAND = 1
+KIND_MODE = 2
+KIND_DETECTIONS = 3
+KIND_NAMES = {KIND_COMMAND: "command", KIND_MODE: "mode", KIND_DETECTIONS: "detections"}
+
+
+def _chunk_path(directory, name, chunk):
+    return os.path.join(directory, f"{name}-{chunk:05d}.bin")
+
+
+def _map_records(path, dtype):
+    """Read-only memmap of a record file (empty array if missing or empty)."""
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=dtype)
+    size = os.path.getsize(path) // dtype.itemsize
+    if size == 0:
+        return np.zeros(0, dtype=dtype)
+    # Ignore a partially written trailing record
+    return np.memmap(path, dtype=dtype, mode="r", shape=(size,))
+
+
+class BlobWriter:
+    """Appends variable-size payloads to chunk files plus a fixed-record index."""
+
+    def __init__(self, directory, name, chunk_bytes):
+        self._directory = directory
+        self._name = name
+        self._chunk_bytes = chunk_bytes
+        self._chunk = 0
+        self._offset = 0
+        self._data = open(_chunk_path(directory, name, 0), "wb")
+        self._index = open(os.path.join(directory, f"{name}.idx"), "wb")
+        self._record = np.zeros(1, dtype=INDEX_DTYPE)
+        self.count = 0
+        self.bytes = 0
+
+    def append(self, stamp, payload, kind=0):
+        if self._offset and self._offset + len(payload) > self._chunk_bytes:
+            self._data.close()
+            self._chunk += 1
+            self._offset = 0
+            self._data = open(_chunk_path(self._directory, self._name, self._chunk), "wb")
+        self._data.write(payload)
+        rec = self._record[0]
+        rec["stamp"], rec["offset"], rec["size"] = stamp, self._offset, len(payload)
+        rec["chunk"], rec["kind"] = self._chunk, kind
+        self._index.write(self._record.tobytes())
+        self._offset += len(payload)
+        self.count += 1
+        self.bytes += len(payload)
+
+    def flush(self):
+        # Data before index, so a reader never sees an index entry without its bytes
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+
+class BlobReader:
+    def __init__(self, directory, name):
+        self._directory = directory
+        self._name = name
+        self.index = _map_records(os.path.join(directory, f"{name}.idx"), INDEX_DTYPE)
+        self.stamps = self.index["stamp"]
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def find(self, stamp):
+        """Index of the first entry at or after stamp."""
+        return int(np.searchsorted(self.stamps, stamp, side="left"))
+
+    def _map(self, chunk):
+        m = self._maps.get(chunk)
+        if m is None:
+            with open(_chunk_path(self._directory, self._name, chunk), "rb") as f:
+                m = self._maps[chunk] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return m
+
+    def read(self, i):
+        """(stamp, kind, payload bytes) of entry i."""
+        rec = self.index[i]
+        offset, size = int(rec["offset"]), int(rec["size"])
+        return float(rec["stamp"]), int(rec["kind"]), self._map(int(rec["chunk"]))[offset:offset + size]
+
+    def close(self):
+        for m in self._maps.values():
+            m.close()
+        self._maps.clear()
+
+
+class TelemetryWriter:
+    def __init__(self, directory):
+        self._file = open(os.path.join(directory, "telemetry.rec"), "wb")
+        self._record = np.zeros(1, dtype=TELEMETRY_DTYPE)
+        self.count = 0
+
+    def append(self, stamp, topic, values):
+        rec = self._record[0]
+        rec["stamp"], rec["topic"] = stamp, TOPIC_IDS[topic]
+        rec["values"] = 0.0
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        rec["values"][:values.size] = values
+        self._file.write(self._record.tobytes())
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class RecordingReader:
+    """Random access to a recording: frames, events and telemetry by time."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported recording version {self.meta.get('version')}")
+        self.frames = BlobReader(directory, "frames")
+        self.events = BlobReader(directory, "events")
+        self.telemetry = _map_records(os.path.join(directory, "telemetry.rec"), TELEMETRY_DTYPE)
+
+    @property
+    def start(self):
+        candidates = [a[0] for a in (self.frames.stamps, self.telemetry["stamp"], self.events.stamps) if len(a)]
+        return float(min(candidates)) if candidates else self.meta.get("start")
+
+    @property
+    def end(self):
+        candidates = [a[-1] for a in (self.frames.stamps, self.telemetry["stamp"], self.events.stamps) if len(a)]
+        return float(max(candidates)) if candidates else self.meta.get("end")
+
+    def frame(self, i):
+        """(stamp, BGR frame) of frame i."""
+        stamp, _, payload = self.frames.read(i)
+        return stamp, cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def event(self, i):
+        """(stamp, kind name, decoded JSON payload) of event i."""
+        stamp, kind, payload = self.events.read(i)
+        return stamp, KIND_NAMES.get(kind, str(kind)), json.loads(bytes(payload))
+
+    def telemetry_index(self, stamp):
+        return int(np.searchsorted(self.telemetry["stamp"], stamp, side="left"))
+
+    def telemetry_sample(self, i):
+        """(stamp, topic, values) of telemetry record i; scalar topics give a float."""
+        rec = self.telemetry[i]
+        topic = TOPIC_NAMES[int(rec["topic"])]
+        width = TOPICS[topic]
+        values = float(rec["values"][0]) if width == 1 else rec["values"][:width].copy()
+        return float(rec["stamp"]), topic, values
+
+    def close(self):
+        self.frames.close()
+        self.events.close()
@@ -0,0 +1,186 @@
+# recording/recorder.py
+"""
+Records an inspection run (see recording/format.py for the layout).
+Producers only enqueue: frames are taken from camera_handler.wait_for_frame
+on a grabber thread, telemetry and commands arrive through CommHandler sinks.
+A single writer thread JPEG-encodes frames and appends everything to disk,
+so no file is shared between threads.
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import cv2
+
+from recording.format import (
+    FORMAT_VERSION, BlobWriter, TelemetryWriter, KIND_COMMAND, KIND_MODE, KIND_DETECTIONS,
+)
+from utils.config import (
+    RECORDING_DIR, RECORDING_JPEG_QUALITY, RECORDING_CHUNK_BYTES, RECORDING_QUEUE_SIZE,
+    CAMERA_TARGET_FPS, DETECTOR_BACKEND, DETECTOR_IMGSZ, MODEL_PATH, CONFIDENCE_THRESHOLD,
+)
+
+_FRAME, _TELEMETRY, _EVENT = 0, 1, 2
+
+# Recording names become a directory under RECORDING_DIR: no separators or dot names
+_VALID_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+
+
+def _recording_path(directory, name):
+    """directory/name, or ValueError if name is not a plain directory name."""
+    if not _VALID_NAME.match(name or "") or ".." in name:
+        raise ValueError(f"invalid recording name {name!r}")
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"invalid recording name {name!r}")
+    return path
+
+
+class Recorder:
+    def __init__(self, name=None, comm=None, wait_for_frame=None, get_detections=None,
+                 directory=RECORDING_DIR, quality=RECORDING_JPEG_QUALITY,
+                 chunk_bytes=RECORDING_CHUNK_BYTES, queue_size=RECORDING_QUEUE_SIZE):
+        # wait_for_frame(last_id, timeout, annotated=False) -> (frame_id, frame or None)
+        # get_detections() -> (frame_id, Detections) of the latest frame
+        self.name = name or time.strftime("run-%Y%m%d-%H%M%S")
+        self.path = _recording_path(directory, self.name)
+        self._comm = comm
+        self._wait_for_frame = wait_for_frame
+        self._get_detections = get_detections
+        self._quality = quality
+        self._chunk_bytes = chunk_bytes
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._running = threading.Event()
+        self._threads = []
+        self.started = None
+        self.dropped = 0
+
+    # --- producers -----------------------------------------------------------
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _on_telemetry(self, topic, stamp, values):
+        self._put((_TELEMETRY, stamp, topic, values))
+
+    def _on_command(self, kind, value):
+        self._put((_EVENT, time.time(), KIND_MODE if kind == "mode" else KIND_COMMAND, value))
+
+    def _grab_frames(self):
+        last_id = None
+        while self._running.is_set():
+            frame_id, frame = self._wait_for_frame(last_id, 0.5, annotated=False)
+            if frame is None:
+                continue
+            stamp = time.time()
+            last_id = frame_id
+            self._put((_FRAME, stamp, frame_id, frame))
+            if self._get_detections:
+                dets_id, dets = self._get_detections()
+                if dets is not None and dets_id == frame_id:
+                    self._put((_EVENT, stamp, KIND_DETECTIONS, dict(dets.to_dict(), frame_id=frame_id)))
+
+    # --- writer ------------------------------------------------------------
+
+    def _write(self):
+        frames = BlobWriter(self.path, "frames", self._chunk_bytes)
+        events = BlobWriter(self.path, "events", self._chunk_bytes)
+        telemetry = TelemetryWriter(self.path)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self._quality]
+        last_flush = time.monotonic()
+        while self._running.is_set() or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                kind, stamp = item[0], item[1]
+                if kind == _FRAME:
+                    ok, buf = cv2.imencode(".jpg", item[3], params)
+                    if ok:
+                        frames.append(stamp, buf.tobytes())
+                elif kind == _TELEMETRY:
+                    telemetry.append(stamp, item[2], item[3])
+                else:
+                    events.append(stamp, json.dumps(item[3]).encode(), item[2])
+            # Keep what's on disk at most a second behind (readable while recording)
+            if time.monotonic() - last_flush > 1.0:
+                frames.flush()
+                events.flush()
+                telemetry.flush()
+                last_flush = time.monotonic()
+        self.counts = {"frames": frames.count, "frame_bytes": frames.bytes,
+                       "events": events.count, "telemetry": telemetry.count}
+        frames.close()
+        events.close()
+        telemetry.close()
+
+    # --- control -----------------------------------------------------------
+
+    def _write_meta(self, **extra):
+        meta = {
+            "version": FORMAT_VERSION,
+            "name": self.name,
+            "start": self.started,
+            "config": {
+                "MODEL_PATH": MODEL_PATH, "CONFIDENCE_THRESHOLD": CONFIDENCE_THRESHOLD,
+                "DETECTOR_BACKEND": DETECTOR_BACKEND, "DETECTOR_IMGSZ": DETECTOR_IMGSZ,
+                "CAMERA_TARGET_FPS": CAMERA_TARGET_FPS, "JPEG_QUALITY": self._quality,
+            },
+        }
+        meta.update(extra)
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=False)
+        self.started = time.time()
+        self._write_meta()
+        self._running.set()
+        self._threads = [threading.Thread(target=self._write, daemon=True)]
+        if self._wait_for_frame:
+            self._threads.append(threading.Thread(target=self._grab_frames, daemon=True))
+        for t in self._threads:
+            t.start()
+        if self._comm:
+            self._comm.add_telemetry_sink(self._on_telemetry)
+            self._comm.command_sinks.append(self._on_command)
+        print(f"[Recorder] recording to {self.path}")
+        return self
+
+    def stop(self):
+        if not self._running.is_set():
+            return
+        if self._comm:
+            self._comm.remove_telemetry_sink(self._on_telemetry)
+            if self._on_command in self._comm.command_sinks:
+                self._comm.command_sinks.remove(self._on_command)
+        self._running.clear()
+        for t in self._threads:
+            t.join(timeout=10.0)
+        self._write_meta(end=time.time(), dropped=self.dropped, **getattr(self, "counts", {}))
+        print(f"[Recorder] stopped {self.path}")
+
+    @property
+    def recording(self):
+        return self._running.is_set()
+
+    def stats(self):
+        return {
+            "recording": self.recording,
+            "name": self.name,
+            "path": self.path,
+            "started": self.started,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,170 @@
+# recording/replay.py
+"""
+Replay of a recorded run in place of live hardware:
+  * ReplayCapture is a cv2.VideoCapture stand-in for camera_handler
+    (start_camera(callback, source=ReplayCapture(...)))
+  * ReplayTransport stands in for RosNodeHandler
+    (CommHandler(mode="ros", ros_factory=lambda: ReplayTransport(...)))
+Both follow a ReplayClock; share one clock to keep frames and telemetry in
+step. speed > 1 plays faster than real time, speed=0 as fast as possible.
+"""
+
+import threading
+import time
+
+from bridge.telemetry_state import TelemetryState
+from recording.format import RecordingReader
+from utils.config import TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES
+
+
+class ReplayClock:
+    """Maps recording time onto wall time at `speed`x."""
+
+    def __init__(self, start, speed=1.0):
+        self.speed = speed
+        self._lock = threading.Lock()
+        self.seek(start)
+
+    def seek(self, stamp):
+        with self._lock:
+            self._origin = stamp
+            self._wall = time.monotonic()
+
+    def now(self):
+        """Current position in recording time."""
+        with self._lock:
+            if not self.speed:
+                return float("inf")
+            return self._origin + (time.monotonic() - self._wall) * self.speed
+
+    def wait_until(self, stamp, stop=None):
+        """Sleep until the clock reaches stamp; returns False if stop was set first."""
+        if not self.speed:
+            return not (stop and stop.is_set())
+        with self._lock:
+            due = self._wall + (stamp - self._origin) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            if stop is not None:
+                return not stop.wait(delay)
+            time.sleep(delay)
+        return True
+
+
+def _reader(recording):
+    return recording if isinstance(recording, RecordingReader) else RecordingReader(recording)
+
+
+class ReplayCapture:
+    """Frames of a recording, timed by their recorded stamps."""
+
+    def __init__(self, recording, speed=1.0, start=None, loop=False, clock=None):
+        self.reader = _reader(recording)
+        self.clock = clock or ReplayClock(self.reader.start if start is None else start, speed)
+        self._loop = loop
+        self._i = 0
+        self.stamp = None
+        self._open = True
+        self.seek(self.reader.start if start is None else start, move_clock=False)
+
+    def seek(self, stamp, move_clock=True):
+        """Continue from the first frame at or after stamp (epoch seconds)."""
+        self._i = self.reader.frames.find(stamp)
+        if move_clock:
+            self.clock.seek(stamp)
+
+    def isOpened(self):
+        return self._open
+
+    def set(self, prop, value):
+        return True
+
+    def get(self, prop):
+        return 0.0
+
+    def read(self):
+        if not self._open:
+            return False, None
+        if self._i >= len(self.reader.frames):
+            if not self._loop or not len(self.reader.frames):
+                return False, None
+            self.seek(self.reader.frames.stamps[0])
+        stamp, frame = self.reader.frame(self._i)
+        self._i += 1
+        self.clock.wait_until(stamp)
+        self.stamp = stamp
+        return True, frame
+
+    def release(self):
+        self._open = False
+
+
+class ReplayTransport:
+    """
+    RosNodeHandler stand-in feeding recorded telemetry into a TelemetryState
+    (stamped with replay wall time so live history windows work). Commands
+    published during replay are kept in .commands, not sent anywhere.
+    """
+
+    def __init__(self, recording, speed=1.0, start=None, clock=None):
+        self.reader = _reader(recording)
+        self.clock = clock or ReplayClock(self.reader.start if start is None else start, speed)
+        self.telemetry = TelemetryState(TELEMETRY_HISTORY_SECONDS, TELEMETRY_HISTORY_RATES)
+        self._listeners = []
+        self.commands = []
+        self.modes = []
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._i = self.reader.telemetry_index(self.reader.start if start is None else start)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def seek(self, stamp):
+        self._i = self.reader.telemetry_index(stamp)
+        self.clock.seek(stamp)
+
+    def _run(self):
+        while not self._stop.is_set():
+            i = self._i
+            if i >= len(self.reader.telemetry):
+                self.finished.set()
+                self._stop.wait(0.1)
+                continue
+            self.finished.clear()
+            stamp, topic, values = self.reader.telemetry_sample(i)
+            if not self.clock.wait_until(stamp, self._stop):
+                return
+            if self._i != i:
+                # seek() moved us while we were waiting
+                continue
+            self._i = i + 1
+            self.telemetry.update(topic, values)
+            for fn in self._listeners:
+                try:
+                    fn()
+                except Exception as e:
+                    print("[ReplayTransport] listener error:", e)
+
+    # --- RosNodeHandler interface -----------------------------------------
+
+    def alive(self):
+        return not self._stop.is_set()
+
+    def publish_command(self, mapped_char):
+        self.commands.append((time.time(), mapped_char))
+
+    def publish_mode(self, mode_str):
+        self.modes.append((time.time(), mode_str))
+
+    def get_latest_data(self):
+        return self.telemetry.to_dict()
+
+    def get_history(self, topic, seconds=None, start=None):
+        return self.telemetry.history(topic, seconds, start)
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
@@ -0,0 +1,95 @@
+# recording/rescore.py
+"""
+Re-run detection over a recording as fast as the model allows and compare
+per-label counts with the detections recorded live.
+
+    python -m recording.rescore recordings/run-20250101-120000 --model new.pt --out scores.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+from camera.detections import Detections
+from camera.detector import load_detector
+from recording.format import RecordingReader
+from utils.config import CONFIDENCE_THRESHOLD, DETECTOR_BACKEND, DETECTOR_IMGSZ, MODEL_PATH
+
+
+def recorded_counts(reader, start=None, end=None):
+    """Per-label detection counts from the run's recorded detections events."""
+    counts, frames = Counter(), 0
+    first = reader.events.find(start) if start is not None else 0
+    for i in range(first, len(reader.events)):
+        stamp, kind, data = reader.event(i)
+        if end is not None and stamp > end:
+            break
+        if kind == "detections":
+            frames += 1
+            counts.update(data.get("labels", ()))
+    return counts, frames
+
+
+def rescore(path, model_path=MODEL_PATH, backend=DETECTOR_BACKEND, imgsz=DETECTOR_IMGSZ,
+            conf=CONFIDENCE_THRESHOLD, start=None, end=None, every=1):
+    reader = RecordingReader(path)
+    model = load_detector(model_path, backend, imgsz)
+    counts, frames = Counter(), 0
+    first = reader.frames.find(start) if start is not None else 0
+    t0 = time.monotonic()
+    for i in range(first, len(reader.frames), max(1, every)):
+        stamp, frame = reader.frame(i)
+        if end is not None and stamp > end:
+            break
+        result = model.predict(source=frame, conf=conf, imgsz=imgsz, verbose=False)[0]
+        counts.update(Detections.from_result(result).labels())
+        frames += 1
+    elapsed = time.monotonic() - t0
+    live, live_frames = recorded_counts(reader, start, end)
+    reader.close()
+    labels = sorted(set(counts) | set(live))
+    return {
+        "recording": path,
+        "model": model_path,
+        "backend": backend,
+        "imgsz": imgsz,
+        "frames": frames,
+        "fps": frames / elapsed if elapsed else None,
+        "labels": {
+            label: {
+                "rescored_per_frame": counts[label] / frames if frames else 0.0,
+                "recorded_per_frame": live[label] / live_frames if live_frames else None,
+            }
+            for label in labels
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score a recorded run with another model")
+    parser.add_argument("recording")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--backend", default=DETECTOR_BACKEND)
+    parser.add_argument("--imgsz", type=int, default=DETECTOR_IMGSZ)
+    parser.add_argument("--conf", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--start", type=float, help="epoch seconds")
+    parser.add_argument("--end", type=float, help="epoch seconds")
+    parser.add_argument("--every", type=int, default=1, help="score every Nth frame")
+    parser.add_argument("--out", help="write the JSON summary here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    summary = rescore(args.recording, args.model, args.backend, args.imgsz, args.conf,
+                      args.start, args.end, args.every)
+    text = json.dumps(summary, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,12 +6,102 @@ MODEL_PATH = "best.pt"
 CAMERA_INDEX = 0
 CONFIDENCE_THRESHOLD = 0.25
 
+# Detector backend: "pytorch", "onnx" (ONNX Runtime) or "openvino".
+# Non-PyTorch exports of MODEL_PATH are generated on first use and cached next
+# to it; they are regenerated when best.pt or DETECTOR_IMGSZ changes.
+DETECTOR_BACKEND = "pytorch"
+DETECTOR_IMGSZ = 640
+DETECTOR_WARMUP_RUNS = 2
+
+# Cameras: name -> {"source": device index / file path / URL, "location": tag
+# their alerts are logged with}. Each camera has its own capture thread;
+# frames that need the detector in the same cycle share one batched predict
+# call. The first camera is the default for callers that don't name one.
+# A downward-facing second camera would be e.g.
+#     "down": {"source": 2, "location": "Underside"},
+CAMERAS = {
+    "front": {"source": CAMERA_INDEX, "location": "Front"},
+}
+
+# Inference rate cap (frames/second); capture always runs at device rate
+# and inference works on the newest frame. 0 disables the cap.
+CAMERA_TARGET_FPS = 15
+
+# How long start_camera() waits for a stopping pipeline to let go of the
+# cameras before refusing to start a new one (seconds)
+CAMERA_STOP_TIMEOUT = 5.0
+
+# Where YOLO runs: "thread" (inside the bridge process) or "process" (separate
+# worker fed through a shared-memory frame ring, uses another CPU core)
+INFERENCE_ENGINE = "thread"
+INFERENCE_WORKER_SLOTS = 3
+
+# Motion gate: reuse the previous detections while the scene is static.
+# MOTION_THRESHOLD is the fraction of (downsampled, grayscale) pixels that must
+# change by more than MOTION_PIXEL_DELTA gray levels to trigger a new detection;
+# MOTION_FORCE_INTERVAL (seconds) forces one anyway.
+MOTION_GATE_ENABLED = True
+MOTION_THRESHOLD = 0.02
+MOTION_PIXEL_DELTA = 25
+MOTION_FORCE_INTERVAL = 2.0
+
+# Tracking: run the detector only every DETECT_EVERY_N_FRAMES frames (or when
+# the tracker's confidence falls below TRACK_MIN_CONFIDENCE) and let an IoU
+# tracker carry boxes forward in between. Tracks get stable ids, so alerts
+# are logged once per tracked object.
+TRACKING_ENABLED = True
+DETECT_EVERY_N_FRAMES = 3
+TRACK_MIN_CONFIDENCE = 0.5
+TRACK_IOU_THRESHOLD = 0.3
+
+# Adaptive inference governor (camera/governor.py): when the detector's p90
+# run time exceeds INFERENCE_LATENCY_BUDGET_MS, or the process uses more than
+# CPU_BUDGET of all cores (None to ignore), step down to a smaller input size,
+# then fewer detector runs (up to GOVERNOR_MAX_DETECT_EVERY, tracking only),
+# then a lower inference rate (GOVERNOR_FPS_STEPS x CAMERA_TARGET_FPS). It
+# steps back up after GOVERNOR_RECOVER_PERIODS checks below GOVERNOR_HEADROOM
+# x budget. Input size only adapts on the pytorch backend since exports are
+# fixed-size.
+GOVERNOR_ENABLED = True
+INFERENCE_LATENCY_BUDGET_MS = 150
+CPU_BUDGET = 0.8
+GOVERNOR_IMGSZ_STEPS = (640, 512, 416, 320)
+GOVERNOR_MAX_DETECT_EVERY = 6
+GOVERNOR_FPS_STEPS = (0.66, 0.5)
+GOVERNOR_ADJUST_INTERVAL = 2.0
+GOVERNOR_HEADROOM = 0.7
+GOVERNOR_RECOVER_PERIODS = 3
+
+# PPE compliance: every detected person must wear these items (class names,
+# case-insensitive). An item counts as worn when at least
+# PPE_CONTAINMENT_THRESHOLD of its box lies inside the person's box.
+PPE_ANALYSIS_ENABLED = True
+PPE_REQUIRED_ITEMS = ("hardhat", "safety_vest")
+PPE_CONTAINMENT_THRESHOLD = 0.6
+
+# Alert store: at most ALERT_CAPACITY alerts are kept in memory; repeats of the
+# same label at the same location within ALERT_DEBOUNCE_SECONDS are merged
+# into one alert with first/last seen times and a count.
+ALERT_CAPACITY = 500
+ALERT_DEBOUNCE_SECONDS = 10.0
+
+# Persistent alert history (SQLite, WAL mode). Set to None to keep alerts in
+# memory only. Writes are batched on a background thread.
+ALERT_DB_PATH = "alerts.db"
+ALERT_DB_BATCH_SIZE = 256
+ALERT_DB_FLUSH_INTERVAL = 0.5
+ALERT_DB_QUEUE_SIZE = 10000
+
 # Control mode: "ros" (default), "serial", or "both"
 CONTROL_MODE = "ros"
 
 # Serial fallback settings (only used if CONTROL_MODE includes "serial")
 SERIAL_PORT = "/dev/ttyUSB0"
 BAUD_RATE = 115200
+# The serial reader thread drains the port continuously and parses each line
+# (JSON or key:value pairs, see bridge/serial_protocol.py) into telemetry.
+# Longer lines without a newline are treated as noise and discarded.
+SERIAL_MAX_LINE = 1024
 
 # Mapping from UI logical command -> payload sent to ESP (over ROS or serial)
 # ESP expects single chars: 'w' (forward), 's' (back), 'a' (left), 'd' (right), 'x' (stop)
@@ -23,9 +113,60 @@ COMMAND_MAP = {
     "stop": "x"
 }
 
+# Transport supervision: a lost serial port or ROS node is reconnected with
+# exponential backoff (TRANSPORT_BACKOFF_INITIAL doubling up to
+# TRANSPORT_BACKOFF_MAX seconds); link health is checked every
+# TRANSPORT_CHECK_INTERVAL seconds. While a link is down only the latest mode
+# and drive command are kept; the drive command is dropped instead of
+# replayed if it is older than TRANSPORT_COMMAND_MAX_AGE seconds.
+TRANSPORT_BACKOFF_INITIAL = 0.5
+TRANSPORT_BACKOFF_MAX = 10.0
+TRANSPORT_CHECK_INTERVAL = 0.5
+TRANSPORT_COMMAND_MAX_AGE = 2.0
+
+# Threads for the ROS executor running the bridge node's callbacks
+ROS_EXECUTOR_THREADS = 2
+
 # Bridge server settings
 BRIDGE_HOST = "0.0.0.0"
 BRIDGE_PORT = 8000
 
-# Websocket ping interval (seconds)
+# Websocket ping interval (seconds); also the telemetry poll interval for
+# transports that can't push updates
 WS_PING_INTERVAL = 0.5
+
+# Telemetry fan-out: at most TELEMETRY_MAX_RATE messages/s are pushed to /ws
+# clients; a client that falls more than TELEMETRY_CLIENT_QUEUE messages
+# behind loses its oldest ones.
+TELEMETRY_MAX_RATE = 20.0
+TELEMETRY_CLIENT_QUEUE = 4
+# Fallback poll interval (seconds) when the transport pushes updates itself
+TELEMETRY_PUSH_POLL_INTERVAL = 5.0
+
+# Telemetry history kept by the transports (seconds) and the expected max
+# rate of each topic (Hz), which sizes the preallocated history rings
+TELEMETRY_HISTORY_SECONDS = 120
+TELEMETRY_HISTORY_RATES = {
+    "ultrasonic_left": 50,
+    "ultrasonic_right": 50,
+    "imu": 200,
+}
+# Upper bound on points returned by /telemetry/history
+HISTORY_MAX_POINTS = 2000
+
+# Video streaming from the bridge (/video.mjpg, /ws/video, /video/frame.jpg).
+# Each frame is JPEG-encoded once and shared by every viewer.
+VIDEO_JPEG_QUALITY = 80
+VIDEO_STREAM_FPS = 15
+# The camera pipeline runs in the bridge process; it starts on /camera/start
+# (the UI's Start Camera button), or on bridge startup with this set
+BRIDGE_CAMERA_AUTOSTART = False
+
+# Run recording (recording/): frames, telemetry and commands are written under
+# RECORDING_DIR/<name>/ by a background thread. Frame data is split into chunk
+# files of RECORDING_CHUNK_BYTES; samples that don't fit in the queue are
+# dropped rather than slowing the pipeline down.
+RECORDING_DIR = "recordings"
+RECORDING_JPEG_QUALITY = 85
+RECORDING_CHUNK_BYTES = 256 * 1024 * 1024
+RECORDING_QUEUE_SIZE = 2048
@@ -0,0 +1,207 @@
+# utils/metrics.py
+"""
+Lightweight process-wide metrics: counters, gauges and fixed-bucket
+histograms kept in one registry and rendered in the Prometheus text format.
+Recording is a lock plus a few integer updates, so it is safe to call on
+per-frame / per-message paths. Counters also keep a short per-second window
+for quick rate readouts (FPS, messages/s) without a Prometheus server.
+"""
+
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds (0.5 ms .. 2.5 s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Seconds of history behind Counter.rate()
+RATE_WINDOW = 5
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, fn=None):
+        # fn() -> current total, for counts already kept elsewhere
+        self._fn = fn
+        self._lock = threading.Lock()
+        self._value = 0
+        self._slots = [0] * RATE_WINDOW
+        self._slot_secs = [0] * RATE_WINDOW
+
+    def inc(self, n=1):
+        sec = int(time.monotonic())
+        i = sec % RATE_WINDOW
+        with self._lock:
+            self._value += n
+            if self._slot_secs[i] != sec:
+                self._slot_secs[i] = sec
+                self._slots[i] = 0
+            self._slots[i] += n
+
+    @property
+    def value(self):
+        return self._fn() if self._fn else self._value
+
+    def rate(self):
+        """Events per second over the last RATE_WINDOW - 1 complete seconds."""
+        if self._fn:
+            return None
+        now = int(time.monotonic())
+        with self._lock:
+            total = sum(n for n, sec in zip(self._slots, self._slot_secs)
+                        if now - RATE_WINDOW < sec < now)
+        return total / (RATE_WINDOW - 1)
+
+
+class Gauge:
+    def __init__(self, fn=None):
+        self._fn = fn
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self._fn() if self._fn else self._value
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.bounds) + 1)   # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative(self):
+        with self._lock:
+            counts = list(self._counts)
+        out, running = [], 0
+        for n in counts:
+            running += n
+            out.append(running)
+        return out
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        cumulative = self.cumulative()
+        if not cumulative[-1]:
+            return None
+        rank = q * cumulative[-1]
+        for bound, n in zip(self.bounds + (float("inf"),), cumulative):
+            if n >= rank:
+                return bound
+        return float("inf")
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}   # name -> (kind, help, {labels tuple: metric})
+
+    def _get(self, kind, factory, name, help, labels):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            entry = self._metrics.setdefault(name, (kind, help, {}))
+            if entry[0] != kind:
+                raise ValueError(f"metric {name} already registered as {entry[0]}")
+            series = entry[2]
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def counter(self, name, help="", labels=None, fn=None):
+        counter = self._get("counter", lambda: Counter(fn), name, help, labels)
+        if fn is not None:
+            counter._fn = fn
+        return counter
+
+    def gauge(self, name, help="", labels=None, fn=None):
+        gauge = self._get("gauge", lambda: Gauge(fn), name, help, labels)
+        if fn is not None:
+            # Re-registration (e.g. a reconnected transport) points at the new source
+            gauge._fn = fn
+        return gauge
+
+    def histogram(self, name, help="", labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get("histogram", lambda: Histogram(buckets), name, help, labels)
+
+    def _items(self):
+        with self._lock:
+            return [(name, kind, help, list(series.items()))
+                    for name, (kind, help, series) in sorted(self._metrics.items())]
+
+    @staticmethod
+    def _safe(fn):
+        try:
+            return fn()
+        except Exception:
+            return None
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, kind, help, series in self._items():
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if kind == "histogram":
+                    bounds = [repr(b) for b in metric.bounds] + ["+Inf"]
+                    for bound, n in zip(bounds, metric.cumulative()):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {n}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+                else:
+                    value = self._safe(lambda: metric.value)
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Compact dict for dashboards: counters -> {value, rate}, gauges -> value,
+        histograms -> {count, mean_ms, p50_ms, p95_ms}. Keys are name{labels}.
+        """
+        out = {}
+        for name, kind, _, series in self._items():
+            for labels, metric in series:
+                key = name + _format_labels(labels)
+                if kind == "counter":
+                    out[key] = {"value": self._safe(lambda: metric.value), "rate": metric.rate()}
+                elif kind == "gauge":
+                    out[key] = self._safe(lambda: metric.value)
+                else:
+                    ms = lambda v: None if v is None else v * 1000.0
+                    out[key] = {
+                        "count": metric.count,
+                        "mean_ms": ms(metric.mean()),
+                        "p50_ms": ms(metric.quantile(0.5)),
+                        "p95_ms": ms(metric.quantile(0.95)),
+                    }
+        return out
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram